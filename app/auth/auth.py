@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from typing import Optional
 from app.models.db_models import Users
 
 from fastapi import Security, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlmodel import Session
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..db.database import get_session 
+from .principal_cache import principal_cache
+from .password_hasher import password_hasher
 
 #secret key, should be estronger in production 
 SECRET_KEY = "myultrasecretkey123"
@@ -16,27 +18,27 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 240
 REFRESH_TOKEN_EXPIRE_HOURS = 4
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt corre en el pool del password_hasher, fuera del event loop
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def hash_password(password):
-    return pwd_context.hash(password)
+async def hash_password(password):
+    return await password_hasher.hash(password)
 
-def authenticate_user(email: str, password: str, db_session):
-    from sqlmodel import select
-    user = db_session.exec(select(Users).where(Users.email == email)).first()
-    if not user or not verify_password(password, user.password_hash):
+async def authenticate_user(email: str, password: str, db_session: AsyncSession):
+    user = (await db_session.exec(select(Users).where(Users.email == email))).first()
+    if not user or not await verify_password(password, user.password_hash):
         return None
     
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -58,9 +60,14 @@ def get_current_user(token: str = Security(oauth2_scheme), db: Session = Depends
         user_id: int = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Token inválido")
+        # Evitar la consulta a Users en cada request si el usuario ya está en cache
+        user = principal_cache.get(int(user_id), payload.get("iat"))
+        if user:
+            return user
         user = db.query(Users).filter(Users.id == int(user_id)).first()
         if not user:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        principal_cache.set(int(user_id), payload.get("iat"), user)
         return user
     except JWTError:
         raise HTTPException(status_code=403, detail="Token inválido o expirado")
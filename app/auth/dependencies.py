@@ -1,14 +1,28 @@
 #protecting routes
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
-from app.models.db_models import Users
+from app.models.db_models import Users, Roles
 from sqlmodel import Session, select
 from app.db.database import get_session
 from app.auth.auth import SECRET_KEY, ALGORITHM
+from app.auth.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+SELLER_ROLE_ID = 2
+# el rol administrador se identifica por su nombre en la tabla roles;
+# si no existe ningún rol con ese nombre, nadie es admin
+ADMIN_ROLE_NAME = "admin"
+
+def role_name(session: Session, role_id: int) -> Optional[str]:
+    role = session.get(Roles, role_id)
+    return role.description.strip().lower() if role and role.description else None
+
+def is_admin(session: Session, user: Users) -> bool:
+    return role_name(session, user.role) == ADMIN_ROLE_NAME
+
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> Users:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,14 +37,19 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     except JWTError:
         raise credentials_exception
     
-    user = session.get(Users, user_id)
+    user = principal_cache.get(int(user_id), payload.get("iat"))
+    if user:
+        return user
+    
+    user = session.get(Users, int(user_id))
     if not user:
         raise credentials_exception
+    principal_cache.set(int(user_id), payload.get("iat"), user)
     return user
 
 def require_role(*allowed_roles: str):
-    def dependency(current_user: Users = Depends(get_current_user)):
-        if current_user.role not in allowed_roles:
+    def dependency(current_user: Users = Depends(get_current_user), session: Session = Depends(get_session)):
+        if current_user.role not in allowed_roles and role_name(session, current_user.role) not in allowed_roles:
             raise HTTPException(status_code=403,
                                 detail=f"Access denied. Role '{current_user.role}' not allowed.")
         return current_user
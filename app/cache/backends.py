@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict
+
+try:
+    import redis
+except ImportError:  # backend compartido opcional
+    redis = None
+
+class InProcessBackend:
+    """
+    Backend en memoria del proceso. Cada worker de uvicorn tiene su propia copia.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: dict, ttl: float):
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr_version(self, namespace: str, member: str) -> int:
+        with self._lock:
+            versions = self._versions.setdefault(namespace, {})
+            versions[member] = versions.get(member, 0) + 1
+            return versions[member]
+
+    def get_versions(self, namespace: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions.get(namespace, {}))
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"No se puede serializar {type(value).__name__}")
+
+class RedisBackend:
+    """
+    Backend compartido entre workers (requiere el paquete `redis`).
+    Los valores se guardan como JSON; las fechas vuelven como string ISO.
+    `client` permite pasar un cliente ya creado (o uno falso en pruebas).
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "marketplace:", client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("El backend 'redis' requiere instalar el paquete redis")
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self._client.get(self._prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: dict, ttl: float):
+        self._client.set(self._prefix + key, json.dumps(value, default=_json_default), ex=max(int(ttl), 1))
+
+    def delete(self, key: str):
+        self._client.delete(self._prefix + key)
+
+    def incr_version(self, namespace: str, member: str) -> int:
+        return self._client.hincrby(self._prefix + namespace, member, 1)
+
+    def get_versions(self, namespace: str) -> Dict[str, int]:
+        raw = self._client.hgetall(self._prefix + namespace)
+        return {k.decode(): int(v) for k, v in raw.items()}
+
+def create_backend(kind: str, url: Optional[str] = None):
+    if kind == "memory":
+        return InProcessBackend()
+    if kind == "redis":
+        return RedisBackend(url)
+    raise ValueError(f"Backend de cache '{kind}' no soportado (use memory o redis)")
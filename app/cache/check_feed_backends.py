@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+from sqlmodel import SQLModel, Session, create_engine
+from ..models.db_models import Products, Users, Roles, Category, ProductStatus
+from .backends import InProcessBackend, RedisBackend
+from .product_feed import ProductFeedCache
+
+# Verifica el feed cacheado sobre los dos backends: el de memoria y RedisBackend
+# con un cliente Redis falso (sin servidor). Recorre miss -> hit -> invalidación
+# de una categoría -> reconstrucción parcial en segundo plano, y compara que
+# ambos backends devuelvan el mismo feed que una consulta directa.
+# Uso (los datos van a una base SQLite temporal propia; DATABASE_URL solo hace
+# falta para importar la aplicación, como en los demás comandos):
+#   python -m app.cache.check_feed_backends
+# Termina con código 1 si algún paso falla.
+
+class FakeRedis:
+    """
+    Subconjunto de redis.Redis que usa RedisBackend (valores en bytes, como el cliente real).
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._hashes = {}
+
+    def get(self, key):
+        item = self._values.get(key)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, key, value, ex=None):
+        expires_at = time.monotonic() + ex if ex else float("inf")
+        self._values[key] = (expires_at, value.encode() if isinstance(value, str) else value)
+
+    def delete(self, key):
+        self._values.pop(key, None)
+
+    def hincrby(self, name, key, amount=1):
+        fields = self._hashes.setdefault(name, {})
+        fields[key.encode()] = str(int(fields.get(key.encode(), b"0")) + amount).encode()
+        return int(fields[key.encode()])
+
+    def hgetall(self, name):
+        return dict(self._hashes.get(name, {}))
+
+def _seed(engine):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Roles(id=2, description="seller"))
+        session.add(Users(id=1, name="feed", email="feed@example.com", password_hash="-", role=2, bio=None, avatar_url=None))
+        session.add(ProductStatus(id=1, status="active"))
+        session.add(ProductStatus(id=3, status="inactive"))
+        session.add_all([Category(id=1, name="cerámica"), Category(id=2, name="pintura")])
+        session.add_all([
+            Products(artist_id=1, title=f"producto {i}", description=None, price=10 + i, file_url=None,
+                     category_id=1 + i % 2, status_id=1, created_at=datetime(2024, 1, 1 + i))
+            for i in range(8)
+        ])
+        session.commit()
+
+def _normalized(feed: list) -> list:
+    # RedisBackend devuelve las fechas como string ISO (así las serializa también la API)
+    return [
+        {**section, "products": [
+            {**product, "created_at": product["created_at"].isoformat() if isinstance(product["created_at"], datetime) else product["created_at"]}
+            for product in section["products"]
+        ]}
+        for section in feed
+    ]
+
+def _wait_idle(feed: ProductFeedCache, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while feed._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def check(name: str, backend, engine) -> bool:
+    feed = ProductFeedCache(backend, ttl=300, max_stale=3600, session_factory=lambda: Session(engine))
+    reference = ProductFeedCache(InProcessBackend(), session_factory=lambda: Session(engine))
+    failures = []
+
+    def expect(step: str, condition: bool):
+        if not condition:
+            failures.append(step)
+
+    first = feed.get_feed(3)
+    expect("miss inicial", feed.misses == 1)
+    expect("feed inicial", _normalized(first) == _normalized(reference.get_feed(3)))
+    feed.get_feed(3)
+    expect("hit", feed.hits == 1)
+
+    with Session(engine) as session:
+        session.add(Products(artist_id=1, title="nuevo", description=None, price=99, file_url=None,
+                             category_id=2, status_id=1, created_at=datetime(2024, 2, 1)))
+        session.commit()
+    feed.invalidate_category(2)
+    stale = feed.get_feed(3)
+    expect("stale-while-revalidate", feed.stale_hits == 1 and "nuevo" not in [p["title"] for s in stale for p in s["products"]])
+    _wait_idle(feed)
+    fresh = feed.get_feed(3)
+    titles = [p["title"] for s in fresh for p in s["products"]]
+    expect("reconstrucción parcial", "nuevo" in titles and feed.hits == 2)
+    uncached = ProductFeedCache(InProcessBackend(), session_factory=lambda: Session(engine))
+    expect("feed reconstruido", _normalized(fresh) == _normalized(uncached.get_feed(3)))
+
+    print(f"{name}: {'OK' if not failures else 'FALLA en ' + ', '.join(failures)} {feed.stats()}")
+    return not failures
+
+if __name__ == "__main__":
+    passed = True
+    for name, make_backend in (("memory", InProcessBackend), ("redis (fake)", lambda: RedisBackend(client=FakeRedis()))):
+        check_engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'feed.db')}",
+                                     connect_args={"check_same_thread": False})
+        _seed(check_engine)
+        passed = check(name, make_backend(), check_engine) and passed
+    raise SystemExit(0 if passed else 1)
@@ -0,0 +1,221 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from sqlmodel import Session, select
+from sqlalchemy import func
+from ..models.db_models import Products, Category
+from ..operations.ratings import rating_average
+from ..db.database import engine
+from .backends import create_backend
+
+# Feed de la home (/products/by-categories/) cacheado por limit_per_category.
+# - FEED_CACHE_TTL: segundos en que el feed se sirve sin revalidar
+# - FEED_CACHE_MAX_STALE: segundos extra en que se sirve viejo mientras se reconstruye
+FEED_CACHE_BACKEND = os.getenv("FEED_CACHE_BACKEND", "memory")
+FEED_CACHE_URL = os.getenv("FEED_CACHE_URL")
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "300"))
+FEED_CACHE_MAX_STALE = float(os.getenv("FEED_CACHE_MAX_STALE", "3600"))
+# cada valor distinto de limit_per_category es una entrada de cache: se acota
+FEED_MAX_PER_CATEGORY = int(os.getenv("FEED_MAX_PER_CATEGORY", "50"))
+
+VERSIONS_NAMESPACE = "feed:category-versions"
+
+logger = logging.getLogger(__name__)
+
+def query_feed_sections(session: Session, limit_per_category: int,
+                        category_ids: Optional[Iterable[int]] = None) -> Dict[str, dict]:
+    """
+    Últimos `limit_per_category` productos visibles de cada categoría (o solo de `category_ids`).
+    """
+    #subconsulta para limitar productos por categoria
+    ranked_products = (
+        select(
+            Products.id,
+            Products.artist_id,
+            Products.title,
+            Products.description,
+            Products.price,
+            Products.is_digital,
+            Products.stock,
+            Products.primary_image_url,
+            Products.rating_count,
+            Products.rating_sum,
+            Products.created_at,
+            Products.category_id,
+            func.row_number().over(
+                partition_by=Products.category_id,
+                order_by=Products.created_at.desc()
+            ).label("rn")
+        )
+        .where(Products.status_id != 3)
+    )
+    if category_ids is not None:
+        ranked_products = ranked_products.where(Products.category_id.in_([int(c) for c in category_ids]))
+    ranked_products = ranked_products.subquery()
+    
+    #consulta principal con JOIN
+    statement = (
+        select(
+            Category.id.label("category_id"),
+            Category.name.label("category_name"),
+            ranked_products.c.id,
+            ranked_products.c.artist_id,
+            ranked_products.c.title,
+            ranked_products.c.description,
+            ranked_products.c.price,
+            ranked_products.c.is_digital,
+            ranked_products.c.stock,
+            ranked_products.c.primary_image_url,
+            ranked_products.c.rating_count,
+            ranked_products.c.rating_sum,
+            ranked_products.c.created_at
+        )
+        .join(ranked_products, Category.id == ranked_products.c.category_id)
+        .where(ranked_products.c.rn <= limit_per_category)
+        .order_by(Category.name, ranked_products.c.created_at.desc())
+    )
+    
+    products_result = session.exec(statement).all()
+    
+    #agrupar por categoria
+    sections = {}
+    for row in products_result:
+        key = str(row.category_id)
+        if key not in sections:
+            sections[key] = {
+                "category_id": row.category_id,
+                "category_name": row.category_name,
+                "products": [],
+                "total_products": 0
+            }
+        
+        sections[key]["products"].append({
+            "id": row.id,
+            "artist_id": row.artist_id,
+            "title": row.title,
+            "description": row.description,
+            "price": row.price,
+            "is_digital": row.is_digital,
+            "stock": row.stock,
+            "image_url": row.primary_image_url,
+            "rating_count": row.rating_count,
+            "rating_average": rating_average(row.rating_count, row.rating_sum),
+            "created_at": row.created_at
+        })
+        sections[key]["total_products"] += 1
+    
+    return sections
+
+
+class ProductFeedCache:
+    """
+    Cache del feed por categorías con stale-while-revalidate.
+
+    Cada categoría tiene un número de versión en el backend; invalidate_category
+    lo incrementa. Un feed cacheado recuerda las versiones con que se construyó,
+    así al leerlo se sabe qué categorías cambiaron y solo esas se vuelven a
+    consultar, en segundo plano, mientras los lectores reciben el feed anterior.
+    """
+
+    def __init__(self, backend, ttl: float = FEED_CACHE_TTL, max_stale: float = FEED_CACHE_MAX_STALE,
+                 session_factory=lambda: Session(engine)):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.session_factory = session_factory
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    @staticmethod
+    def _key(limit_per_category: int) -> str:
+        return f"feed:{limit_per_category}"
+
+    def get_feed(self, limit_per_category: int) -> list:
+        # fuera de rango se ajusta (sin error) para no romper clientes existentes
+        limit_per_category = min(max(limit_per_category, 1), FEED_MAX_PER_CATEGORY)
+        entry = self.backend.get(self._key(limit_per_category))
+        versions = self.backend.get_versions(VERSIONS_NAMESPACE)
+        
+        if entry is None:
+            # primera petición (o expiró del todo): se construye de forma síncrona
+            self.misses += 1
+            entry = self._rebuild(limit_per_category, versions)
+            return self._as_list(entry)
+        
+        dirty = [cid for cid, version in versions.items() if entry["versions"].get(cid, 0) != version]
+        if time.time() - entry["built_at"] > self.ttl:
+            self.stale_hits += 1
+            self._revalidate(limit_per_category, None)
+        elif dirty:
+            self.stale_hits += 1
+            self._revalidate(limit_per_category, dirty)
+        else:
+            self.hits += 1
+        return self._as_list(entry)
+
+    def invalidate_category(self, *category_ids: Optional[int]):
+        for category_id in {c for c in category_ids if c is not None}:
+            self.backend.incr_version(VERSIONS_NAMESPACE, str(category_id))
+
+    def _revalidate(self, limit_per_category: int, dirty: Optional[list]):
+        # single-flight por proceso: un solo hilo reconstruye cada feed
+        with self._lock:
+            if limit_per_category in self._refreshing:
+                return
+            self._refreshing.add(limit_per_category)
+        
+        def worker():
+            try:
+                versions = self.backend.get_versions(VERSIONS_NAMESPACE)
+                self._rebuild(limit_per_category, versions, dirty)
+            except Exception as e:
+                logger.error("Error reconstruyendo el feed por categorías: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(limit_per_category)
+        
+        threading.Thread(target=worker, name="feed-revalidate", daemon=True).start()
+
+    def _rebuild(self, limit_per_category: int, versions: Dict[str, int], dirty: Optional[list] = None) -> dict:
+        # las versiones se leen antes de consultar: si alguien invalida durante
+        # la reconstrucción, el feed queda marcado como sucio para la próxima
+        key = self._key(limit_per_category)
+        current = self.backend.get(key) if dirty is not None else None
+        
+        with self.session_factory() as session:
+            if current is None:
+                sections = query_feed_sections(session, limit_per_category)
+                built_at = time.time()
+            else:
+                sections = dict(current["sections"])
+                fresh = query_feed_sections(session, limit_per_category, dirty)
+                for category_id in dirty:
+                    if category_id in fresh:
+                        sections[category_id] = fresh[category_id]
+                    else:
+                        sections.pop(category_id, None)
+                built_at = current["built_at"]
+        
+        entry = {"built_at": built_at, "versions": versions, "sections": sections}
+        self.backend.set(key, entry, self.ttl + self.max_stale)
+        return entry
+
+    @staticmethod
+    def _as_list(entry: dict) -> list:
+        return sorted(entry["sections"].values(), key=lambda section: section["category_name"])
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshing": len(self._refreshing),
+        }
+
+product_feed = ProductFeedCache(create_backend(FEED_CACHE_BACKEND, FEED_CACHE_URL))
@@ -0,0 +1,110 @@
+import logging
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+from sqlmodel import Session, select
+from ..db.database import engine
+from ..models.db_models import Users, Roles
+
+# Muestreo aleatorio de usuarios por rol sin ORDER BY RAND().
+# Se mantiene en memoria el pool de ids de cada rol (array de int64: ~8 MB por
+# millón de usuarios), leído del índice de role y renovado cada
+# ROLE_POOL_TTL segundos en segundo plano. Cada request elige k ids con
+# random.sample (O(k)) y los trae con una consulta IN por clave primaria.
+# Solo se crean pools para roles que existen en la tabla roles; las altas,
+# bajas y cambios de rol de usuarios invalidan el pool afectado.
+ROLE_POOL_TTL = float(os.getenv("ROLE_POOL_TTL", "300"))
+
+logger = logging.getLogger(__name__)
+
+class RoleSampler:
+    def __init__(self, ttl: float = ROLE_POOL_TTL):
+        self.ttl = ttl
+        self._pools: Dict[int, array] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def _load_ids(session: Session, role: int) -> array:
+        return array("q", session.exec(select(Users.id).where(Users.role == role)).all())
+
+    def _store(self, role: int, ids: array):
+        with self._lock:
+            self._pools[role] = ids
+            self._loaded_at[role] = time.monotonic()
+            self._refreshing.discard(role)
+            self.loads += 1
+
+    def _pool(self, session: Session, role: int) -> Optional[array]:
+        with self._lock:
+            ids = self._pools.get(role)
+            expired = ids is not None and time.monotonic() - self._loaded_at[role] > self.ttl
+            if expired and role not in self._refreshing:
+                self._refreshing.add(role)
+            else:
+                expired = False
+        if ids is None:
+            # primera vez: carga en el request (roles desconocidos no crean pool)
+            if session.get(Roles, role) is None:
+                return None
+            ids = self._load_ids(session, role)
+            self._store(role, ids)
+        elif expired:
+            # pool vencido: se sigue usando mientras un hilo lo renueva
+            threading.Thread(target=self._refresh, args=(role,), name="role-pool-refresh", daemon=True).start()
+        return ids
+
+    def _refresh(self, role: int):
+        try:
+            with Session(engine) as session:
+                self._store(role, self._load_ids(session, role))
+        except Exception as e:
+            with self._lock:
+                self._refreshing.discard(role)
+            logger.error("Error renovando el pool de ids del rol %s: %s", role, e)
+
+    def sample(self, session: Session, role: int, k: int) -> List[Users]:
+        """
+        Hasta `k` usuarios del rol elegidos al azar (uniforme sobre el pool).
+        Los ids que ya no existen o cambiaron de rol desde la última carga se descartan.
+        """
+        ids = self._pool(session, role)
+        if not ids:
+            return []
+        picked = [ids[i] for i in random.sample(range(len(ids)), min(k, len(ids)))]
+        users = {
+            user.id: user
+            for user in session.exec(
+                select(Users).where(Users.id.in_(picked)).where(Users.role == role)
+            ).all()
+        }
+        return [users[user_id] for user_id in picked if user_id in users]
+
+    def invalidate(self, role: int = None):
+        with self._lock:
+            if role is None:
+                self._loaded_at = {r: 0.0 for r in self._loaded_at}
+            elif role in self._loaded_at:
+                self._loaded_at[role] = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "ttl_seconds": self.ttl,
+                "loads": self.loads,
+                "roles": {
+                    role: {
+                        "ids": len(ids),
+                        "age_seconds": round(now - self._loaded_at[role], 1),
+                    }
+                    for role, ids in self._pools.items()
+                },
+            }
+
+role_sampler = RoleSampler()
@@ -1,8 +1,12 @@
 import os
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 from pathlib import Path
+from .engine_profile import load_profile, build_engine_kwargs, pool_stats, PoolWaitStats, to_async_url
+from .threadpool import install_blocking_call_guard
 
 # Cargar variables del .env
 
@@ -15,11 +19,41 @@ SQLACHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLACHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL no está definida en el archivo .env")
 
-engine = create_engine(SQLACHEMY_DATABASE_URL, echo=True)
+# Perfil del engine (DB_ENV=dev/test/prod + overrides por variable de entorno)
+engine_profile = load_profile()
+pool_wait_stats = PoolWaitStats()
+
+engine = create_engine(
+    SQLACHEMY_DATABASE_URL,
+    **build_engine_kwargs(SQLACHEMY_DATABASE_URL, engine_profile, pool_wait_stats)
+)
+install_blocking_call_guard(engine)
+
+# Engine async (aiomysql / aiosqlite) para los endpoints async def
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLACHEMY_DATABASE_URL)
+async_pool_wait_stats = PoolWaitStats()
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **build_engine_kwargs(ASYNC_DATABASE_URL, engine_profile, async_pool_wait_stats, is_async=True)
+)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # expire_on_commit=False: en async no se permite recargar atributos de forma implícita
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
         
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    from ..search.fulltext import create_search_index
+    SQLModel.metadata.create_all(engine)
+    create_search_index(engine)
+
+def get_pool_stats() -> dict:
+    return {
+        "sync": pool_stats(engine, engine_profile, pool_wait_stats),
+        "async": pool_stats(async_engine, engine_profile, async_pool_wait_stats),
+    }
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, StaticPool
+
+# Perfiles de engine por entorno. Los valores se pueden sobrescribir
+# individualmente con variables de entorno (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...)
+
+@dataclass(frozen=True)
+class EngineProfile:
+    name: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+    echo: bool
+
+PRESETS = {
+    "dev": EngineProfile("dev", pool_size=5, max_overflow=5, pool_timeout=10,
+                         pool_recycle=1800, pool_pre_ping=True, echo=False),
+    "test": EngineProfile("test", pool_size=2, max_overflow=0, pool_timeout=5,
+                          pool_recycle=-1, pool_pre_ping=False, echo=False),
+    # MySQL corta conexiones inactivas (wait_timeout), reciclar antes de eso
+    "prod": EngineProfile("prod", pool_size=10, max_overflow=10, pool_timeout=30,
+                          pool_recycle=280, pool_pre_ping=True, echo=False),
+}
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def load_profile(env: Optional[str] = None) -> EngineProfile:
+    """
+    Construye el perfil activo a partir de DB_ENV (dev/test/prod) y de las
+    variables de entorno que sobrescriben cada parámetro.
+    """
+    env = (env or os.getenv("DB_ENV", "prod")).lower()
+    if env not in PRESETS:
+        raise ValueError(f"DB_ENV '{env}' no es válido. Use uno de: {', '.join(PRESETS)}")
+    base = PRESETS[env]
+
+    return EngineProfile(
+        name=env,
+        pool_size=int(os.getenv("DB_POOL_SIZE", base.pool_size)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", base.max_overflow)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", base.pool_timeout)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", base.pool_recycle)),
+        pool_pre_ping=_env_bool("DB_POOL_PRE_PING", base.pool_pre_ping),
+        echo=_env_bool("DB_ECHO", base.echo),
+    )
+
+
+class PoolWaitStats:
+    """
+    Acumula cuánto tiempo esperan los requests para obtener una conexión del pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += waited
+            if waited > self.max_wait:
+                self.max_wait = waited
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """
+    Mide el tiempo de espera de cada checkout del pool.
+    """
+
+    wait_stats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            if self.wait_stats is not None:
+                self.wait_stats.record(0.0, timed_out=True)
+            raise
+        if self.wait_stats is not None:
+            self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def build_engine_kwargs(url: str, profile: EngineProfile, wait_stats: PoolWaitStats, is_async: bool = False) -> dict:
+    """
+    Traduce un perfil a los argumentos de create_engine / create_async_engine según el dialecto.
+    """
+    if url.startswith("sqlite"):
+        kwargs = {"echo": profile.echo, "connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite://"):
+            kwargs["poolclass"] = StaticPool
+        return kwargs
+
+    base_pool = TimedAsyncQueuePool if is_async else TimedQueuePool
+    pool_class = type("Profiled" + base_pool.__name__, (base_pool,), {"wait_stats": wait_stats})
+    return {
+        "echo": profile.echo,
+        "poolclass": pool_class,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+        "pool_recycle": profile.pool_recycle,
+        "pool_pre_ping": profile.pool_pre_ping,
+    }
+
+
+def pool_stats(engine, profile: EngineProfile, wait_stats: PoolWaitStats) -> dict:
+    """
+    Estado actual del pool: conexiones en uso, overflow y tiempos de espera.
+    """
+    pool = engine.pool
+    stats = {"profile": asdict(profile), "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            # máximo de conexiones que este worker puede abrir contra la BD
+            "max_connections": profile.pool_size + max(profile.max_overflow, 0),
+        })
+    stats["wait"] = wait_stats.snapshot()
+    return stats
+
+
+# Drivers async equivalentes a los drivers sync usados en DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    Convierte la URL sync (pymysql/sqlite/psycopg2) en su equivalente async.
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        raise ValueError("DATABASE_URL no tiene un formato válido")
+    if scheme in ASYNC_DRIVERS.values():
+        return url
+    if scheme not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver async configurado para '{scheme}'. Defina ASYNC_DATABASE_URL")
+    return f"{ASYNC_DRIVERS[scheme]}://{rest}"
@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import anyio
+from sqlalchemy import event
+
+# Número máximo de hilos que pueden estar ejecutando trabajo sync de BD a la vez.
+# Debe ser <= pool_size + max_overflow del engine para no quedarse esperando conexiones.
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "10"))
+
+# off | warn | raise -> qué hacer cuando una consulta sync se ejecuta dentro del event loop
+DB_BLOCKING_GUARD = os.getenv("DB_BLOCKING_GUARD", "warn").lower()
+
+logger = logging.getLogger(__name__)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+class BlockingDBCallError(RuntimeError):
+    pass
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = anyio.CapacityLimiter(DB_THREADPOOL_SIZE)
+        return _limiter
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """
+    Ejecuta una sección sync de BD en el pool de hilos acotado, sin bloquear el event loop.
+    """
+    return await anyio.to_thread.run_sync(
+        functools.partial(func, *args, **kwargs),
+        limiter=_get_limiter()
+    )
+
+def offload_db(func):
+    """
+    Decorador: convierte una función sync de BD en una corrutina que corre en el pool de hilos.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_thread(func, *args, **kwargs)
+    return wrapper
+
+def _running_on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def install_blocking_call_guard(engine, mode: str = DB_BLOCKING_GUARD):
+    """
+    Audita el engine sync: detecta consultas bloqueantes ejecutadas en el hilo del event loop.
+    Con mode="raise" (p. ej. en tests) la consulta falla en lugar de congelar el worker.
+    """
+    if mode == "off":
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _check_blocking(conn, cursor, statement, parameters, context, executemany):
+        if not _running_on_event_loop():
+            return
+        message = f"Consulta sync ejecutada dentro del event loop: {statement.splitlines()[0][:120]}"
+        if mode == "raise":
+            raise BlockingDBCallError(message)
+        logger.warning(message)
@@ -0,0 +1,183 @@
+"""
+Cola de salida de emails.
+
+Los endpoints solo encolan el mensaje (enqueue) y responden; un hilo en
+segundo plano los envía por lotes reutilizando una sola conexión SMTP
+autenticada por lote, con reintentos y backoff exponencial.
+
+Para probar en local sin un servidor real:
+
+    python -m aiosmtpd -n -l localhost:1025
+    EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=false uvicorn app.main:app
+"""
+import heapq
+import itertools
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from typing import Optional
+
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+EMAIL_FROM = os.getenv("EMAIL_FROM", EMAIL_USER)
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "20"))
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+# segundos de espera antes del primer reintento; se duplica en cada intento
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "2"))
+
+logger = logging.getLogger(__name__)
+
+class OutboxMessage:
+    def __init__(self, to: str, message: MIMEMultipart):
+        self.to = to
+        self.message = message
+        self.enqueued_at = time.time()
+        self.attempts = 0
+
+class EmailOutbox:
+    def __init__(self, batch_size: int = EMAIL_BATCH_SIZE, max_attempts: int = EMAIL_MAX_ATTEMPTS,
+                 backoff: float = EMAIL_RETRY_BACKOFF):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._queue = queue.Queue()
+        self._retries = []
+        self._retry_seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_delivery_lag = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            if self._retries:
+                logger.warning("Se descartan %s emails pendientes de reintento", len(self._retries))
+
+    def enqueue(self, to: str, message: MIMEMultipart):
+        """
+        Encola un email para envío en segundo plano. No bloquea.
+        """
+        self._queue.put(OutboxMessage(to, message))
+        with self._lock:
+            self.enqueued += 1
+
+    def _next_batch(self) -> list:
+        batch = []
+        now = time.time()
+        with self._lock:
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self._retries)[2])
+        if not batch:
+            try:
+                batch.append(self._queue.get(timeout=0.5))
+            except queue.Empty:
+                return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+
+    def _schedule_retry(self, item: OutboxMessage, error: Exception):
+        item.attempts += 1
+        with self._lock:
+            if item.attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error("Email a %s descartado tras %s intentos: %s", item.to, item.attempts, error)
+                return
+            self.retried += 1
+            delay = self.backoff * (2 ** (item.attempts - 1))
+            heapq.heappush(self._retries, (time.time() + delay, next(self._retry_seq), item))
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=EMAIL_TIMEOUT)
+        if EMAIL_USE_TLS:
+            server.starttls()
+        if EMAIL_USER:
+            server.login(EMAIL_USER, EMAIL_PASSWORD)
+        return server
+
+    def _send_batch(self, batch: list):
+        with self._lock:
+            self.batches += 1
+        try:
+            server = self._connect()
+        except Exception as e:
+            for item in batch:
+                self._schedule_retry(item, e)
+            return
+
+        try:
+            for item in batch:
+                try:
+                    server.sendmail(EMAIL_FROM, item.to, item.message.as_string())
+                except Exception as e:
+                    self._schedule_retry(item, e)
+                    continue
+                with self._lock:
+                    self.sent += 1
+                    self.last_delivery_lag = time.time() - item.enqueued_at
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def _oldest_pending(self) -> Optional[float]:
+        with self._queue.mutex:
+            oldest = self._queue.queue[0].enqueued_at if self._queue.queue else None
+        with self._lock:
+            for _, _, item in self._retries:
+                if oldest is None or item.enqueued_at < oldest:
+                    oldest = item.enqueued_at
+        return oldest
+
+    def stats(self) -> dict:
+        oldest = self._oldest_pending()
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "waiting_retry": len(self._retries),
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "batches": self.batches,
+                # antigüedad del email pendiente más viejo
+                "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "last_delivery_lag_seconds": round(self.last_delivery_lag, 3),
+            }
+
+email_outbox = EmailOutbox()
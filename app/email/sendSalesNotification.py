@@ -1,4 +1,3 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -17,91 +16,76 @@ EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 EMAIL_FROM = os.getenv("EMAIL_FROM", EMAIL_USER)
 
-def send_sale_notification_email(seller_email: str, seller_name: str, sale_details: Dict):
+def build_sale_notification_email(seller_email: str, seller_name: str, sale_details: Dict) -> MIMEMultipart:
     """
-    Envía un correo de notificación de venta al vendedor
+    Construye el correo de notificación de venta para el vendedor
     """
+    # Crear mensaje
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_FROM
+    msg['To'] = seller_email
+    msg['Subject'] = f"¡Nueva venta realizada! - Pedido #{sale_details['order_id']}"
     
-    try:
-        # Crear mensaje
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = seller_email
-        msg['Subject'] = f"¡Nueva venta realizada! - Pedido #{sale_details['order_id']}"
+    # Crear el cuerpo del email
+    body = f"""
+    <html>
+    <body>
+        <h2>¡Felicitaciones {seller_name}!</h2>
+        <p>Se ha realizado una nueva venta de tu producto.</p>
         
-        # Crear el cuerpo del email
-        body = f"""
-        <html>
-        <body>
-            <h2>¡Felicitaciones {seller_name}!</h2>
-            <p>Se ha realizado una nueva venta de tu producto.</p>
-            
-            <h3>Detalles de la venta:</h3>
-            <table border="1" style="border-collapse: collapse; width: 100%;">
-                <tr>
-                    <td><strong>Número de pedido:</strong></td>
-                    <td>#{sale_details['order_id']}</td>
-                </tr>
-                <tr>
-                    <td><strong>Fecha de venta:</strong></td>
-                    <td>{sale_details['sale_date']}</td>
-                </tr>
-                <tr>
-                    <td><strong>Comprador:</strong></td>
-                    <td>{sale_details['buyer_name']} ({sale_details['buyer_email']})</td>
-                </tr>
-                <tr>
-                    <td><strong>Total de la venta:</strong></td>
-                    <td>${sale_details['total_amount']:.2f}</td>
-                </tr>
-                <tr>
-                    <td><strong>Método de pago:</strong></td>
-                    <td>{sale_details['payment_method']}</td>
-                </tr>
-            </table>
-            
-            <h3>Productos vendidos:</h3>
-            <table border="1" style="border-collapse: collapse; width: 100%;">
-                <tr>
-                    <th>Producto</th>
-                    <th>Cantidad</th>
-                    <th>Precio unitario</th>
-                    <th>Subtotal</th>
-                </tr>
-        """
-        
-        for item in sale_details['items']:
-            body += f"""
-                <tr>
-                    <td>{item['product_title']}</td>
-                    <td>{item['quantity']}</td>
-                    <td>${item['price']:.2f}</td>
-                    <td>${item['quantity'] * item['price']:.2f}</td>
-                </tr>
-            """
+        <h3>Detalles de la venta:</h3>
+        <table border="1" style="border-collapse: collapse; width: 100%;">
+            <tr>
+                <td><strong>Número de pedido:</strong></td>
+                <td>#{sale_details['order_id']}</td>
+            </tr>
+            <tr>
+                <td><strong>Fecha de venta:</strong></td>
+                <td>{sale_details['sale_date']}</td>
+            </tr>
+            <tr>
+                <td><strong>Comprador:</strong></td>
+                <td>{sale_details['buyer_name']} ({sale_details['buyer_email']})</td>
+            </tr>
+            <tr>
+                <td><strong>Total de la venta:</strong></td>
+                <td>${sale_details['total_amount']:.2f}</td>
+            </tr>
+            <tr>
+                <td><strong>Método de pago:</strong></td>
+                <td>{sale_details['payment_method']}</td>
+            </tr>
+        </table>
         
-        body += """
-            </table>
-            
-            <br>
-            <p>Gracias por usar nuestra plataforma.</p>
-            <p>Saludos cordiales,<br>El equipo de la plataforma</p>
-        </body>
-        </html>
+        <h3>Productos vendidos:</h3>
+        <table border="1" style="border-collapse: collapse; width: 100%;">
+            <tr>
+                <th>Producto</th>
+                <th>Cantidad</th>
+                <th>Precio unitario</th>
+                <th>Subtotal</th>
+            </tr>
+    """
+    
+    for item in sale_details['items']:
+        body += f"""
+            <tr>
+                <td>{item['product_title']}</td>
+                <td>{item['quantity']}</td>
+                <td>${item['price']:.2f}</td>
+                <td>${item['quantity'] * item['price']:.2f}</td>
+            </tr>
         """
+    
+    body += """
+        </table>
         
-        msg.attach(MIMEText(body, 'html'))
-        
-        # Enviar el email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_FROM, seller_email, text)
-        server.quit()
-        
-        return True
-        
-    except Exception as e:
-        print(f"Error enviando email: {str(e)}")
-        return False
\ No newline at end of file
+        <br>
+        <p>Gracias por usar nuestra plataforma.</p>
+        <p>Saludos cordiales,<br>El equipo de la plataforma</p>
+    </body>
+    </html>
+    """
+    
+    msg.attach(MIMEText(body, 'html'))
+    return msg
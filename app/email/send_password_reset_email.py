@@ -1,4 +1,3 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -16,7 +15,7 @@ EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 EMAIL_FROM = os.getenv("EMAIL_FROM", EMAIL_USER)
 
-def send_password_reset_email(user_email: str, user_name: str, reset_link: str):
+def build_password_reset_email(user_email: str, user_name: str, reset_link: str) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg["From"] = EMAIL_FROM
     msg["To"] = user_email
@@ -29,10 +28,4 @@ def send_password_reset_email(user_email: str, user_name: str, reset_link: str):
     <p>Este enlace expirará en 1 hora.</p>
     """
     msg.attach(MIMEText(body, "html"))
-
-    server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-    server.starttls()
-    server.login(EMAIL_USER, EMAIL_PASSWORD)
-    server.sendmail(EMAIL_FROM, user_email, msg.as_string())
-    server.quit()
-
+    return msg
@@ -1,9 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import products,users,auth, category, product_status, image, orders, payments, reviews, commissions, sales
-from app.db.database import create_db_and_tables
+from app.routers import products,users,auth, category, product_status, image, orders, payments, reviews, commissions, sales, exports, metrics
+from app.db.database import create_db_and_tables, async_engine
+from app.paypal.paypal import PayPalClient
+from app.auth.password_hasher import password_hasher
+from app.email.outbox import email_outbox
+from app.operations.reservations import run_reservation_sweeper
+from app.search.suggest import run_suggest_rebuilder
+from app.operations.seller_counters import run_seller_count_reconciler
+from app.operations.idempotency import run_idempotency_sweeper
+from app.operations.sales_rollup import run_sales_rollup_pruner
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Recursos de larga vida compartidos por todos los requests del worker
+    app.state.paypal = PayPalClient()
+    tasks = []
+    try:
+        email_outbox.start()
+        tasks = [
+            asyncio.create_task(run_reservation_sweeper()),
+            asyncio.create_task(run_suggest_rebuilder()),
+            asyncio.create_task(run_seller_count_reconciler()),
+            asyncio.create_task(run_idempotency_sweeper()),
+            asyncio.create_task(run_sales_rollup_pruner()),
+        ]
+        yield
+    finally:
+        # se ejecuta también si el arranque falla a mitad o el servidor se cancela
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # drenar la cola pendiente sin bloquear el event loop
+        await asyncio.to_thread(email_outbox.stop)
+        await app.state.paypal.aclose()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +51,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # el SPA lee el cursor de la página siguiente desde este header
+    expose_headers=["X-Next-Cursor"],
 )
 @app.get("/")
 def root():
@@ -35,4 +73,7 @@ app.include_router(reviews.router)
 
 app.include_router(commissions.router)
 
-app.include_router(sales.router)
\ No newline at end of file
+app.include_router(sales.router)
+app.include_router(exports.router)
+
+app.include_router(metrics.router)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, Column, Text
 from datetime import datetime,timedelta
 from uuid import uuid4
 
@@ -16,6 +17,12 @@ class ProductStatus(SQLModel, table=True):
     products: List["Products"] = Relationship(back_populates="status")
     
 class Products(SQLModel, table=True):
+    __table_args__ = (
+        # listado por categoría paginado con keyset (created_at, id): el orden sale del índice
+        # y status_id (al final) filtra los inactivos sin leer la fila
+        Index("ix_products_category_created_id_status", "category_id", "created_at", "id", "status_id"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     artist_id: int = Field(foreign_key="users.id")
     title: str
@@ -24,6 +31,13 @@ class Products(SQLModel, table=True):
     is_digital: bool = False
     file_url: Optional[str]
     stock: int = Field(default=1, ge=0)
+    # unidades retenidas por checkouts en curso (ver StockReservation)
+    reserved: int = Field(default=0, ge=0)
+    # URL de la primera imagen (menor id), mantenida en cada escritura de imágenes
+    primary_image_url: Optional[str] = None
+    # resumen de reseñas mantenido por operations.ratings (histograma en ProductRating)
+    rating_count: int = Field(default=0, ge=0)
+    rating_sum: int = Field(default=0, ge=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     category_id: int = Field(foreign_key="category.id")
@@ -33,6 +47,10 @@ class Products(SQLModel, table=True):
     status: Optional[ProductStatus] = Relationship(back_populates="products")
     images: List["Image"] = Relationship(back_populates="product")
     
+    @property
+    def rating_average(self) -> Optional[float]:
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else None
+    
 class Users(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -41,7 +59,12 @@ class Users(SQLModel, table=True):
     role: int = Field(foreign_key="roles.id")
     bio: Optional[str]
     avatar_url: Optional[str]
+    # productos del vendedor (mantenido por operations.seller_counters)
+    product_count: int = Field(default=0, ge=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+# ranking de vendedores por cantidad de productos, paginado con keyset (product_count, id)
+Index("ix_users_role_product_count_id", Users.role, Users.product_count.desc(), Users.id)
     
 class Image(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -55,7 +78,7 @@ class Order(SQLModel, table=True):
     buyer_id: int = Field(foreign_key="users.id")
     total_amount: float
     status: str = "PENDING"
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     payment_ref: Optional[str] = None 
     
     items: List["Order_Items"] = Relationship(back_populates="order")
@@ -69,6 +92,22 @@ class Order_Items(SQLModel, table=True):
     
     order: Optional["Order"] = Relationship(back_populates="items")
 
+class StockReservation(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: int = Field(foreign_key="order.id", index=True)
+    product_id: int = Field(foreign_key="products.id")
+    quantity: int = Field(ge=1)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+
+class SalesRollup(SQLModel, table=True):
+    """
+    Unidades vendidas (órdenes pagadas) por producto y por hora.
+    """
+    product_id: int = Field(foreign_key="products.id", primary_key=True)
+    bucket_start: datetime = Field(primary_key=True, index=True)
+    quantity: int = Field(default=0, ge=0)
+
 class Payments(SQLModel, table= True):
     id: Optional[int] = Field(default=None, primary_key=True)
     order_id: int = Field(foreign_key="order.id")
@@ -78,13 +117,26 @@ class Payments(SQLModel, table= True):
     paid_at: datetime = Field(default_factory=datetime.utcnow)
     
 class Review(SQLModel, table=True):
+    __table_args__ = (
+        # reseñas de un producto paginadas por fecha
+        Index("ix_review_product_created_id", "product_id", "created_at", "id"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="users.id")
     product_id: int = Field(foreign_key="products.id")
     rating: int = Field(ge=1, le=5)
     comment: Optional[str]
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ProductRating(SQLModel, table=True):
+    """
+    Histograma de estrellas por producto: cantidad de reseñas con cada puntaje.
+    """
+    product_id: int = Field(foreign_key="products.id", primary_key=True)
+    stars: int = Field(primary_key=True, ge=1, le=5)
+    count: int = Field(default=0, ge=0)
+
 class Commission(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     product_id: int = Field(foreign_key="products.id")
@@ -100,4 +152,25 @@ class PasswordResetToken(SQLModel, table=True):
     user_id: int
     token: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    expires_at: datetime = Field(default_factory=lambda: datetime.utcnow() + timedelta(hours=1))
\ No newline at end of file
+    expires_at: datetime = Field(default_factory=lambda: datetime.utcnow() + timedelta(hours=1))
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    Respuesta guardada de una solicitud con Idempotency-Key, por (usuario, clave).
+    """
+    __table_args__ = (
+        Index("ux_idempotency_user_key", "user_id", "key", unique=True),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    key: str = Field(max_length=255)
+    endpoint: str
+    request_hash: str
+    status: str = "in_progress"  # in_progress / completed
+    status_code: Optional[int] = None
+    response_body: Optional[str] = Field(default=None, sa_column=Column(Text))
+    # mientras está en curso: hasta cuándo la retiene el worker que la procesa
+    locked_until: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
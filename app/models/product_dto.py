@@ -17,10 +17,17 @@ class ProductCreate(ProductBase):
     artist_id: int
     image_url: Optional[str] = None 
     
+class ProductBulkRow(ProductBase):
+    # en la importación masiva el artista por defecto es el usuario autenticado
+    artist_id: Optional[int] = None
+    image_url: Optional[str] = None
+    
 class ProductRead(ProductBase):
     id: int
     artist_id: int
     created_at: datetime
+    rating_count: int = 0
+    rating_average: Optional[float] = None
     
 class ProductUpdate(SQLModel):
     title: Optional[str] = None
@@ -47,16 +54,19 @@ class ProductWithImage(SQLModel):
     category_id: int
     status_id: int
     image_url: Optional[str] = None  # URL de la imagen
+    rating_count: int = 0
+    rating_average: Optional[float] = None
     
 class ProductsPaginatedResponse(SQLModel):
     products: List[ProductWithImage]
     category_name: str
-    total: int
+    total: Optional[int] = None  # None si include_total=false
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None  # para pedir la siguiente página con ?cursor=
     
 class ProductStatusUpdateRequest(BaseModel):
     product_id: int
@@ -82,5 +92,5 @@ class InactiveProductResponse(BaseModel):
     created_at: datetime
     category_id: int
     status_id: int
-    image_url: Optional[str]
-    
\ No newline at end of file
+    image_url: Optional[str] = None
+    images: List[ProductImageResponse] = []
\ No newline at end of file
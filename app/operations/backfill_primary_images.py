@@ -0,0 +1,41 @@
+import argparse
+from sqlmodel import Session, select
+from sqlalchemy import func
+from ..db.database import engine
+from ..models.db_models import Products
+from .images import refresh_primary_image
+
+# Rellena Products.primary_image_url para productos creados antes de la columna.
+# Uso (una sola vez, tras agregar la columna):
+#   python -m app.operations.backfill_primary_images [--batch-size 1000]
+#
+# Recorre los productos por rangos de id y confirma cada lote por separado,
+# así no mantiene una transacción larga sobre toda la tabla.
+
+def backfill(batch_size: int = 1000) -> int:
+    updated = 0
+    last_id = 0
+    with Session(engine) as session:
+        max_id = session.exec(select(func.max(Products.id))).one() or 0
+        while last_id < max_id:
+            product_ids = session.exec(
+                select(Products.id)
+                .where(Products.id > last_id)
+                .order_by(Products.id)
+                .limit(batch_size)
+            ).all()
+            if not product_ids:
+                break
+            refresh_primary_image(session, *product_ids)
+            session.commit()
+            updated += len(product_ids)
+            last_id = product_ids[-1]
+            print(f"productos procesados: {updated} (hasta id {last_id})")
+    return updated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rellena Products.primary_image_url desde la tabla Image")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    total = backfill(args.batch_size)
+    print(f"Backfill terminado: {total} productos")
@@ -0,0 +1,242 @@
+import codecs
+import csv
+import json
+import os
+import time
+from typing import AsyncIterator, List, Tuple
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlmodel import Session, select
+from sqlalchemy import insert
+from ..models.db_models import Products, Image, Category, ProductStatus, Users
+from ..models.product_dto import ProductBulkRow
+from ..db.threadpool import run_in_db_thread
+from ..cache.product_feed import product_feed
+from ..search.facets import facet_engine
+from ..search.suggest import suggest_index
+from ..search.suggest import INACTIVE_STATUS_ID
+from .seller_counters import adjust_product_count
+
+# Importación masiva de productos (POST /products/bulk).
+# Acepta un arreglo JSON, NDJSON o CSV; NDJSON y CSV se leen en streaming.
+# Las filas se procesan en bloques de BULK_IMPORT_CHUNK: validación de tipos
+# por fila, validación de referencias (categoría, estado, artista) con una
+# consulta IN por bloque, y luego una transacción por bloque con los
+# productos en lote y las imágenes en un solo INSERT multi-fila.
+
+BULK_IMPORT_CHUNK = int(os.getenv("BULK_IMPORT_CHUNK", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "20000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+def _clean(raw: dict) -> dict:
+    # celdas vacías de CSV = campo no enviado (aplican los valores por defecto)
+    return {key.strip(): value for key, value in raw.items() if key and value not in ("", None)}
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def iter_upload_rows(request: Request) -> AsyncIterator[dict]:
+    """
+    Filas crudas del cuerpo según Content-Type (application/json, application/x-ndjson, text/csv).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    
+    if content_type == "application/json":
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un arreglo JSON de productos")
+        for raw in data:
+            yield raw if isinstance(raw, dict) else {"__invalid__": raw}
+    
+    elif content_type in ("application/x-ndjson", "application/ndjson"):
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                raw = {"__invalid__": line.strip()}
+            yield raw if isinstance(raw, dict) else {"__invalid__": raw}
+    
+    elif content_type == "text/csv":
+        header = None
+        block = []
+        quotes = 0
+        async for line in _iter_lines(request):
+            block.append(line)
+            quotes += line.count('"')
+            # solo se corta en fin de línea fuera de comillas (un campo puede tener saltos de línea)
+            if quotes % 2:
+                continue
+            records = list(csv.reader(block))
+            block, quotes = [], 0
+            for record in records:
+                if header is None:
+                    header = [column.strip() for column in record]
+                elif any(cell.strip() for cell in record):
+                    yield dict(zip(header, record))
+        if block:
+            for record in csv.reader(block):
+                if header is not None:
+                    yield dict(zip(header, record))
+    
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type no soportado. Use application/json, application/x-ndjson o text/csv"
+        )
+
+class _ImportContext:
+    """
+    Estado compartido entre bloques: usuario, ids ya verificados y resultados.
+    """
+    def __init__(self, user: Users, is_admin: bool):
+        self.user_id = user.id
+        self.is_admin = is_admin
+        self.known = {"category": set(), "status": set(), "artist": {user.id}}
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row_number, "errors": messages})
+
+def _missing(session: Session, column, ids: set, known: set) -> set:
+    unknown = ids - known
+    if unknown:
+        known.update(session.exec(select(column).where(column.in_(unknown))).all())
+    return ids - known
+
+def import_chunk(session: Session, context: _ImportContext, rows: List[Tuple[int, dict]]):
+    # 1) tipos y reglas por fila
+    valid = []
+    for row_number, raw in rows:
+        if "__invalid__" in raw:
+            context.error(row_number, ["La fila no es un objeto JSON"])
+            continue
+        try:
+            item = ProductBulkRow(**_clean(raw))
+        except ValidationError as e:
+            context.error(row_number, [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ])
+            continue
+        if item.artist_id is None:
+            item.artist_id = context.user_id
+        messages = []
+        if item.price < 0:
+            messages.append("price: debe ser mayor o igual a 0")
+        if item.stock < 0:
+            messages.append("stock: debe ser mayor o igual a 0")
+        if item.artist_id != context.user_id and not context.is_admin:
+            messages.append("artist_id: solo puede importar productos propios")
+        if messages:
+            context.error(row_number, messages)
+            continue
+        valid.append((row_number, item))
+    
+    if not valid:
+        return
+    
+    # 2) referencias: una consulta IN por tabla para todo el bloque
+    missing_categories = _missing(session, Category.id, {item.category_id for _, item in valid}, context.known["category"])
+    missing_statuses = _missing(session, ProductStatus.id, {item.status_id for _, item in valid}, context.known["status"])
+    missing_artists = _missing(session, Users.id, {item.artist_id for _, item in valid}, context.known["artist"])
+    
+    products = []
+    accepted = []
+    for row_number, item in valid:
+        messages = []
+        if item.category_id in missing_categories:
+            messages.append(f"category_id: la categoría {item.category_id} no existe")
+        if item.status_id in missing_statuses:
+            messages.append(f"status_id: el estado {item.status_id} no existe")
+        if item.artist_id in missing_artists:
+            messages.append(f"artist_id: el usuario {item.artist_id} no existe")
+        if messages:
+            context.error(row_number, messages)
+            continue
+        products.append(Products(**item.model_dump(exclude={"image_url"}), primary_image_url=item.image_url))
+        accepted.append((row_number, item))
+    
+    if not products:
+        return
+    
+    # 3) una transacción por bloque
+    try:
+        session.add_all(products)
+        session.flush()
+        
+        images = [
+            {"product_id": product.id, "image_url": item.image_url}
+            for product, (_, item) in zip(products, accepted)
+            if item.image_url
+        ]
+        if images:
+            session.exec(insert(Image).values(images))
+        
+        counted = {}
+        for product in products:
+            counted[product.artist_id] = counted.get(product.artist_id, 0) + 1
+        for artist_id, delta in sorted(counted.items()):
+            adjust_product_count(session, artist_id, delta)
+        
+        # datos para el índice de sugerencias antes del commit (evita recargar cada producto)
+        indexed = [(product.id, product.title) for product in products if product.status_id != INACTIVE_STATUS_ID]
+        categories = {product.category_id for product in products}
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        for row_number, _ in accepted:
+            context.error(row_number, [f"Error al guardar el bloque: {str(e)}"])
+        return
+    
+    context.inserted += len(products)
+    product_feed.invalidate_category(*categories)
+    facet_engine.invalidate()
+    for product_id, title in indexed:
+        suggest_index.upsert("product", product_id, title, 0)
+
+async def import_products(request: Request, session: Session, user: Users, is_admin: bool) -> dict:
+    context = _ImportContext(user, is_admin)
+    started = time.perf_counter()
+    received = 0
+    chunk = []
+    
+    async for raw in iter_upload_rows(request):
+        received += 1
+        if received > BULK_IMPORT_MAX_ROWS:
+            context.error(received, [f"Se superó el máximo de {BULK_IMPORT_MAX_ROWS} filas por importación"])
+            received -= 1
+            break
+        chunk.append((received, raw))
+        if len(chunk) >= BULK_IMPORT_CHUNK:
+            await run_in_db_thread(import_chunk, session, context, chunk)
+            chunk = []
+    if chunk:
+        await run_in_db_thread(import_chunk, session, context, chunk)
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "received": received,
+        "inserted": context.inserted,
+        "failed": context.failed,
+        "errors": context.errors,
+        "errors_truncated": context.failed > len(context.errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(context.inserted / elapsed, 1) if elapsed > 0 else None,
+    }
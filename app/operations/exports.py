@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlmodel import Session, select
+from sqlalchemy import func
+from ..db.database import engine
+from ..models.db_models import Order, Order_Items, Products, Payments
+
+# Exportación de ventas/órdenes en CSV o NDJSON.
+# Las filas salen de un cursor del servidor (stream_results + yield_per) y se
+# escriben en bloques de EXPORT_CHUNK_ROWS filas, opcionalmente comprimidos con
+# gzip a medida que se generan: la memoria no depende del tamaño del export y
+# el cliente recibe bytes desde el primer bloque (sin timeouts de request).
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+
+EXPORT_COLUMNS = [
+    "order_id", "order_created_at", "order_status", "buyer_id", "order_total",
+    "item_id", "product_id", "product_title", "seller_id", "quantity", "unit_price",
+    "payment_provider", "payment_ref", "payment_status", "paid_at",
+]
+
+def export_statement(seller_id: Optional[int] = None, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None, order_status: Optional[str] = None):
+    """
+    Una fila por ítem de orden con su orden, producto y último pago registrado.
+    """
+    # una orden puede tener más de un pago (capture y confirm): solo el último.
+    # Subconsulta correlacionada: se resuelve por orden exportada con el índice
+    # de payments.order_id, en lugar de agrupar la tabla de pagos completa.
+    last_payment_id = (
+        select(func.max(Payments.id))
+        .where(Payments.order_id == Order.id)
+        .correlate(Order)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Order.id.label("order_id"),
+            Order.created_at.label("order_created_at"),
+            Order.status.label("order_status"),
+            Order.buyer_id,
+            Order.total_amount.label("order_total"),
+            Order_Items.id.label("item_id"),
+            Order_Items.product_id,
+            Products.title.label("product_title"),
+            Products.artist_id.label("seller_id"),
+            Order_Items.quantity,
+            Order_Items.price.label("unit_price"),
+            Payments.provider.label("payment_provider"),
+            Payments.payment_ref,
+            Payments.status.label("payment_status"),
+            Payments.paid_at,
+        )
+        .join(Order_Items, Order_Items.order_id == Order.id)
+        .join(Products, Products.id == Order_Items.product_id)
+        .outerjoin(Payments, Payments.id == last_payment_id)
+        # mismo orden que el índice de order.created_at (la PK va incluida en
+        # él): el rango de fechas se lee en orden y las filas salen sin
+        # materializar el resultado completo
+        .order_by(Order.created_at, Order.id, Order_Items.id)
+    )
+    if seller_id is not None:
+        statement = statement.where(Products.artist_id == seller_id)
+    if date_from is not None:
+        statement = statement.where(Order.created_at >= date_from)
+    if date_to is not None:
+        statement = statement.where(Order.created_at < date_to)
+    if order_status is not None:
+        statement = statement.where(Order.status == order_status)
+    return statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _rows(statement) -> Iterator[dict]:
+    # sesión propia: vive lo que dure el stream, no lo que dura el request
+    with Session(engine) as session:
+        for row in session.exec(statement):
+            yield {column: _plain(value) for column, value in zip(EXPORT_COLUMNS, row)}
+
+def _csv_chunks(rows: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+def _ndjson_chunks(rows: Iterator[dict]) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(statement, format: str, gzip: bool = False) -> Iterator[bytes]:
+    chunks = _csv_chunks(_rows(statement)) if format == "csv" else _ndjson_chunks(_rows(statement))
+    encoded = (chunk.encode("utf-8") for chunk in chunks)
+    return _gzip(encoded) if gzip else encoded
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from ..db.database import async_engine
+from ..models.db_models import IdempotencyKey
+
+# Idempotencia para endpoints con efectos costosos (PayPal, cobros).
+# - La respuesta exitosa se guarda por (usuario, Idempotency-Key) durante
+#   IDEMPOTENCY_TTL_HOURS; los reintentos reciben la misma respuesta sin
+#   volver a ejecutar el endpoint.
+# - Duplicados concurrentes en el mismo worker esperan el resultado del primero
+#   (futures en memoria); entre workers, la fila "in_progress" hace de lock y
+#   los demás esperan sondeando hasta que se complete. Mientras el endpoint
+#   corre, la fila se renueva cada IDEMPOTENCY_HEARTBEAT_SECONDS: el lock solo
+#   vence si el worker que la procesaba murió.
+# - Si la solicitud falla, la fila se borra y el cliente puede reintentar.
+#
+# En una base existente la tabla hay que crearla a mano (sin ella, cualquier
+# request con Idempotency-Key responde 500). MySQL:
+#   CREATE TABLE idempotencykey (
+#       id INTEGER NOT NULL AUTO_INCREMENT PRIMARY KEY,
+#       user_id INTEGER NOT NULL,
+#       `key` VARCHAR(255) NOT NULL,
+#       endpoint VARCHAR(255) NOT NULL,
+#       request_hash VARCHAR(255) NOT NULL,
+#       status VARCHAR(255) NOT NULL,
+#       status_code INTEGER,
+#       response_body TEXT,
+#       locked_until DATETIME,
+#       created_at DATETIME NOT NULL,
+#       expires_at DATETIME NOT NULL,
+#       FOREIGN KEY (user_id) REFERENCES users (id)
+#   );
+#   CREATE UNIQUE INDEX ux_idempotency_user_key ON idempotencykey (user_id, `key`);
+#   CREATE INDEX ix_idempotencykey_expires_at ON idempotencykey (expires_at);
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_HEARTBEAT_SECONDS = float(os.getenv("IDEMPOTENCY_HEARTBEAT_SECONDS", str(IDEMPOTENCY_LOCK_SECONDS / 3)))
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.25"))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+# (usuario, clave) -> (future, endpoint, fingerprint) de la solicitud en curso
+_inflight: Dict[Tuple[int, str], Tuple[asyncio.Future, str, str]] = {}
+
+def _mismatch() -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail="La Idempotency-Key ya se usó con una solicitud diferente"
+    )
+
+def request_fingerprint(*parts) -> str:
+    raw = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _replay(status_code: int, body) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+def _session() -> AsyncSession:
+    # sesión propia: los commits del registro no se mezclan con la transacción del endpoint
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+async def _claim(user_id: int, key: str, endpoint: str, fingerprint: str) -> Optional[Tuple[int, object]]:
+    """
+    Reserva la clave para esta solicitud (None) o devuelve la respuesta ya guardada.
+    """
+    deadline = time.monotonic() + IDEMPOTENCY_LOCK_SECONDS
+    while True:
+        async with _session() as session:
+            now = datetime.utcnow()
+            record = (await session.exec(
+                select(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id)
+                .where(IdempotencyKey.key == key)
+            )).first()
+            
+            if record and record.expires_at <= now:
+                await session.delete(record)
+                await session.commit()
+                record = None
+            
+            if record is None:
+                session.add(IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    endpoint=endpoint,
+                    request_hash=fingerprint,
+                    locked_until=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                    expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+                ))
+                try:
+                    await session.commit()
+                    return None
+                except IntegrityError:
+                    # otro worker registró la misma clave al mismo tiempo
+                    await session.rollback()
+                    continue
+            
+            if record.endpoint != endpoint or record.request_hash != fingerprint:
+                raise _mismatch()
+            
+            if record.status == "completed":
+                return record.status_code, json.loads(record.response_body)
+            
+            if record.locked_until is None or record.locked_until <= now:
+                # el worker que la procesaba no terminó a tiempo: tomarla con un UPDATE condicional
+                result = await session.exec(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.id == record.id)
+                    .where(IdempotencyKey.status == "in_progress")
+                    .where(IdempotencyKey.locked_until == record.locked_until)
+                    .values(locked_until=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS))
+                )
+                await session.commit()
+                if result.rowcount:
+                    return None
+                continue
+        
+        if time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="Una solicitud con esta Idempotency-Key sigue en curso",
+                headers={"Retry-After": "1"}
+            )
+        await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+async def _heartbeat(user_id: int, key: str):
+    # renueva el lock mientras el endpoint sigue corriendo (se cancela al terminar)
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_HEARTBEAT_SECONDS)
+        try:
+            async with _session() as session:
+                await session.exec(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.user_id == user_id)
+                    .where(IdempotencyKey.key == key)
+                    .where(IdempotencyKey.status == "in_progress")
+                    .values(locked_until=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS))
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error("Error renovando el lock de idempotencia: %s", e)
+
+async def _complete(user_id: int, key: str, status_code: int, body):
+    async with _session() as session:
+        await session.exec(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .values(
+                status="completed",
+                status_code=status_code,
+                response_body=json.dumps(body),
+                locked_until=None,
+            )
+        )
+        await session.commit()
+
+async def _release(user_id: int, key: str):
+    async with _session() as session:
+        await session.exec(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .where(IdempotencyKey.status == "in_progress")
+        )
+        await session.commit()
+
+async def run_idempotent(user_id: int, key: Optional[str], endpoint: str, fingerprint: str,
+                         handler: Callable[[], Awaitable]):
+    """
+    Ejecuta `handler` una sola vez por (user_id, key). Sin clave se ejecuta normalmente.
+    Las repeticiones devuelven la respuesta guardada con el header Idempotent-Replayed.
+    """
+    if not key:
+        return await handler()
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key demasiado larga (máximo 255 caracteres)")
+    
+    scope = (user_id, key)
+    inflight = _inflight.get(scope)
+    if inflight is not None:
+        inflight_future, inflight_endpoint, inflight_fingerprint = inflight
+        if inflight_endpoint != endpoint or inflight_fingerprint != fingerprint:
+            raise _mismatch()
+        # duplicado concurrente en este worker: esperar el resultado del primero
+        status_code, body = await asyncio.shield(inflight_future)
+        return _replay(status_code, body)
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[scope] = (future, endpoint, fingerprint)
+    try:
+        stored = await _claim(user_id, key, endpoint, fingerprint)
+        if stored is not None:
+            future.set_result(stored)
+            return _replay(*stored)
+        
+        heartbeat = asyncio.create_task(_heartbeat(user_id, key))
+        try:
+            body = jsonable_encoder(await handler())
+        except BaseException:
+            await asyncio.shield(_release(user_id, key))
+            raise
+        finally:
+            heartbeat.cancel()
+        
+        await _complete(user_id, key, 200, body)
+        future.set_result((200, body))
+        return body
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+            # evita el aviso "exception was never retrieved" si no había duplicados esperando
+            future.exception()
+        raise
+    finally:
+        _inflight.pop(scope, None)
+
+async def purge_expired_keys() -> int:
+    async with _session() as session:
+        result = await session.exec(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()))
+        await session.commit()
+        return result.rowcount
+
+async def run_idempotency_sweeper(interval: float = IDEMPOTENCY_SWEEP_INTERVAL):
+    """
+    Tarea de fondo (lifespan): borra las claves vencidas cada `interval` segundos.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await purge_expired_keys()
+            if purged:
+                logger.info("Claves de idempotencia vencidas borradas: %s", purged)
+        except Exception as e:
+            logger.error("Error borrando claves de idempotencia vencidas: %s", e)
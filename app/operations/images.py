@@ -0,0 +1,51 @@
+from typing import Dict, List
+from sqlmodel import Session, select
+from sqlalchemy import update
+from ..models.db_models import Products, Image
+
+def first_image_subquery():
+    """
+    Subconsulta correlacionada con la URL de la primera imagen (menor id) del producto.
+    Permite traer la imagen en la misma consulta del listado, una fila por producto.
+    """
+    return (
+        select(Image.image_url)
+        .where(Image.product_id == Products.id)
+        .order_by(Image.id)
+        .limit(1)
+        .correlate(Products)
+        .scalar_subquery()
+    )
+
+def refresh_primary_image(session: Session, *product_ids: int):
+    """
+    Recalcula Products.primary_image_url dentro de la transacción en curso.
+    Debe llamarse después de hacer flush de los cambios en Image.
+    """
+    product_ids = [product_id for product_id in set(product_ids) if product_id is not None]
+    if not product_ids:
+        return
+    session.exec(
+        update(Products)
+        .where(Products.id.in_(product_ids))
+        .values(primary_image_url=first_image_subquery())
+        .execution_options(synchronize_session=False)
+    )
+
+def load_product_images(session: Session, product_ids) -> Dict[int, List[Image]]:
+    """
+    Imágenes de varios productos agrupadas por product_id (ordenadas por id).
+    Reemplaza la consulta por producto (N+1) en los listados.
+    """
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return {}
+    images = session.exec(
+        select(Image)
+        .where(Image.product_id.in_(product_ids))
+        .order_by(Image.product_id, Image.id)
+    ).all()
+    grouped = {}
+    for image in images:
+        grouped.setdefault(image.product_id, []).append(image)
+    return grouped
@@ -0,0 +1,82 @@
+from typing import Dict, Optional
+from sqlmodel import Session, select
+from sqlalchemy import update, case
+from ..models.db_models import Products
+
+# Estado que toma un producto cuando su stock llega a cero
+SOLD_STATUS_ID = 2
+
+# Todas las operaciones son UPDATE condicionales (stock = stock - q WHERE stock >= q):
+# la BD decide de forma atómica, sin leer-restar-escribir en Python, así que
+# dos checkouts concurrentes nunca venden la misma unidad.
+# Las unidades reservadas por otros checkouts (Products.reserved) no se pueden vender;
+# `held` son las unidades que la propia orden tenía reservadas y se liberan al descontar.
+
+def _decrement_values(quantity, held=0):
+    # status_id va primero: MySQL evalúa los SET de izquierda a derecha con los
+    # valores ya actualizados, así el CASE ve el stock anterior al descuento
+    return (
+        (Products.status_id, case((Products.stock == quantity, SOLD_STATUS_ID), else_=Products.status_id)),
+        (Products.stock, Products.stock - quantity),
+        (Products.reserved, Products.reserved - held),
+    )
+
+def _available_guard(quantity, held=0):
+    return Products.stock - Products.reserved + held >= quantity
+
+def decrement_stock(db: Session, quantities: Dict[int, int]) -> Dict[int, bool]:
+    """
+    Descuenta stock producto por producto y reporta el resultado de cada uno.
+    Los UPDATE se ejecutan en orden de id para que transacciones concurrentes
+    tomen los locks de fila en el mismo orden y no se produzcan deadlocks.
+    """
+    results = {}
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = db.exec(
+            update(Products)
+            .where(Products.id == product_id)
+            .where(_available_guard(quantity))
+            .ordered_values(*_decrement_values(quantity))
+            .execution_options(synchronize_session=False)
+        )
+        results[product_id] = result.rowcount == 1
+    return results
+
+def decrement_stock_bulk(db: Session, quantities: Dict[int, int], held: Optional[Dict[int, int]] = None) -> bool:
+    """
+    Descuenta el stock de varios productos con un solo UPDATE (todo o nada).
+    `held` son las cantidades que la orden ya tenía reservadas (consume_reservations).
+    Si alguna fila no cumple la guarda devuelve False y el llamador debe hacer
+    rollback; insufficient_stock indica después qué productos fallaron.
+    """
+    if not quantities:
+        return True
+
+    quantity = case(quantities, value=Products.id)
+    held = {product_id: min(q, quantities[product_id]) for product_id, q in (held or {}).items() if product_id in quantities}
+    held_quantity = case(held, value=Products.id, else_=0) if held else 0
+    result = db.exec(
+        update(Products)
+        .where(Products.id.in_(quantities))
+        .where(_available_guard(quantity, held_quantity))
+        .ordered_values(*_decrement_values(quantity, held_quantity))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantities)
+
+def insufficient_stock(db: Session, quantities: Dict[int, int], held: Optional[Dict[int, int]] = None) -> Dict[int, bool]:
+    """
+    Reporte por producto: True si hay stock disponible para la cantidad pedida.
+    """
+    if not quantities:
+        return {}
+    held = held or {}
+    rows = db.exec(
+        select(Products.id, Products.stock, Products.reserved).where(Products.id.in_(quantities))
+    ).all()
+    available = {row.id: row.stock - row.reserved for row in rows}
+    return {
+        product_id: available.get(product_id, 0) + held.get(product_id, 0) >= quantity
+        for product_id, quantity in quantities.items()
+    }
@@ -0,0 +1,89 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from ..db.database import engine
+from .pagination import encode_cursor, decode_cursor
+
+# Listados paginados y en streaming compartidos por los routers.
+# - format=json (por defecto): sin `limit` ni `cursor` devuelve todas las filas,
+#   como antes de la paginación (los clientes existentes no cambian). Con `limit`
+#   o `cursor` devuelve una página de `limit` filas (LIST_DEFAULT_LIMIT si solo
+#   viene el cursor) ordenadas por la clave (id ascendente); el cursor de la
+#   siguiente página va en el header X-Next-Cursor (expuesto por CORS en
+#   app.main para el frontend).
+# - format=ndjson / format=sse: recorre todas las filas desde el cursor con un
+#   cursor del servidor (yield_per), serializando de a una; la memoria no crece
+#   con el tamaño de la tabla. En este modo `limit` no aplica.
+
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "50"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "500"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+@dataclass
+class ListParams:
+    limit: Optional[int]
+    cursor: Optional[str]
+    format: str
+
+def list_params(
+    limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson|sse)$")
+) -> ListParams:
+    return ListParams(limit=limit, cursor=cursor, format=format)
+
+def _after_cursor(statement, key_column, cursor: Optional[str]):
+    statement = statement.order_by(key_column)
+    if cursor:
+        statement = statement.where(key_column > decode_cursor(cursor, id=int)["id"])
+    return statement
+
+def _serialize(row, read_model) -> str:
+    if not isinstance(row, read_model):
+        row = read_model.model_validate(row, from_attributes=True)
+    return row.model_dump_json()
+
+def keyset_page(session: Session, statement, key_column, params: ListParams, response: Response) -> list:
+    limit = params.limit or LIST_DEFAULT_LIMIT
+    rows = session.exec(_after_cursor(statement, key_column, params.cursor).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor({"id": getattr(rows[-1], key_column.key)})
+    return rows
+
+def stream_rows(statement, key_column, read_model, params: ListParams) -> StreamingResponse:
+    statement = _after_cursor(statement, key_column, params.cursor).execution_options(
+        yield_per=STREAM_BATCH_SIZE, stream_results=True
+    )
+    
+    def generate():
+        # sesión propia: vive lo que dure el stream, no lo que dura el request
+        with Session(engine) as session:
+            last_id = None
+            for row in session.exec(statement):
+                last_id = getattr(row, key_column.key)
+                if params.format == "sse":
+                    yield f"id: {encode_cursor({'id': last_id})}\ndata: {_serialize(row, read_model)}\n\n"
+                else:
+                    yield _serialize(row, read_model) + "\n"
+                # las filas ya enviadas no se retienen en la sesión
+                session.expunge(row)
+            if params.format == "sse":
+                yield f"event: end\ndata: {json.dumps({'last_id': last_id})}\n\n"
+    
+    media_type = "text/event-stream" if params.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
+def list_rows(session: Session, statement, key_column, read_model, params: ListParams, response: Response):
+    """
+    Punto de entrada de los endpoints de listado: página JSON o stream según `format`.
+    """
+    if params.format == "json":
+        if params.limit is None and params.cursor is None:
+            return session.exec(statement.order_by(key_column)).all()
+        return keyset_page(session, statement, key_column, params, response)
+    return stream_rows(statement, key_column, read_model, params)
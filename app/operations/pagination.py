@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+# Cursores opacos para paginación keyset: el cliente solo los devuelve tal cual.
+
+def encode_cursor(values: dict) -> str:
+    data = {
+        key: {"__dt__": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, **expected: type) -> dict:
+    """
+    Decodifica el cursor. `expected` indica las claves obligatorias y su tipo
+    (p. ej. created_at=datetime, id=int); si falta alguna o no coincide, responde 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values = {
+            key: datetime.fromisoformat(value["__dt__"]) if isinstance(value, dict) and "__dt__" in value else value
+            for key, value in data.items()
+        }
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    for key, kind in expected.items():
+        value = values.get(key)
+        # bool es subclase de int: no aceptarlo como id
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
@@ -3,6 +3,7 @@ from typing import Optional
 from sqlmodel import Session, select
 from ..models.db_models import Products
 from ..db.database import create_engine, Session
+from .inventory import decrement_stock
 
 # def get_product_by_id(product_id: int) -> Optional[Product]:
 #     with Session(create_engine) as session:
@@ -15,23 +16,19 @@ def update_product_stock(db: Session, product_id: int, quantity_sold: int):
     Actualiza el stock de un producto y cambia su estado si es necesario
     """
     
-    product = db.query(Products).filter(Products.id == product_id).first()
+    product = db.get(Products, product_id)
     
     if not product:
         raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado")
     
-    if product.stock < quantity_sold:
+    # Rebajar el stock con un UPDATE condicional (no se puede vender de más)
+    # Si el stock llega a cero el producto pasa a sold (2)
+    if not decrement_stock(db, {product_id: quantity_sold})[product_id]:
+        db.refresh(product)
         raise HTTPException(
             status_code=400,
-            detail=f"Stock insuficiente para el producto {product.name}. Stock disponible: {product.stock}"
+            detail=f"Stock insuficiente para el producto {product.title}. Stock disponible: {product.stock}"
         )
     
-    #Rebajar el stock
-    product.stock -= quantity_sold
-    
-    # Si el stock llega a cero, cambiar estado a sold (2)
-    if product.stock <= 0:
-        product.stock = 0
-        product.status = 2  # sold
-    
+    db.refresh(product)
     return product
\ No newline at end of file
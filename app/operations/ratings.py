@@ -0,0 +1,91 @@
+from typing import Dict, Optional
+from sqlmodel import Session, select
+from sqlalchemy import update, delete, func
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from ..models.db_models import Products, Review, ProductRating
+
+# Resumen de reseñas por producto: Products.rating_count / rating_sum y el
+# histograma ProductRating. Se actualiza en la misma transacción que crea o
+# borra la reseña, así los listados muestran el promedio sin agregar Review.
+
+def rating_average(count: int, total: int) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+def _histogram_upsert(dialect: str, product_id: int, stars: int):
+    row = {"product_id": product_id, "stars": stars, "count": 1}
+    if dialect == "mysql":
+        statement = mysql.insert(ProductRating).values(row)
+        return statement.on_duplicate_key_update(count=ProductRating.count + 1)
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(ProductRating).values(row)
+    return statement.on_conflict_do_update(
+        index_elements=[ProductRating.product_id, ProductRating.stars],
+        set_={"count": ProductRating.count + 1},
+    )
+
+def apply_review(session: Session, product_id: int, stars: int, delta: int):
+    """
+    Suma (delta=1) o resta (delta=-1) una reseña de `stars` estrellas al resumen del producto.
+    El commit lo hace quien llama, junto con el alta o baja de la reseña.
+    """
+    session.exec(
+        update(Products)
+        .where(Products.id == product_id)
+        .values(
+            rating_count=Products.rating_count + delta,
+            rating_sum=Products.rating_sum + delta * stars,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if delta > 0:
+        session.exec(_histogram_upsert(session.get_bind().dialect.name, product_id, stars))
+    else:
+        session.exec(
+            update(ProductRating)
+            .where(ProductRating.product_id == product_id)
+            .where(ProductRating.stars == stars)
+            .where(ProductRating.count > 0)
+            .values(count=ProductRating.count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def rating_histogram(session: Session, product_id: int) -> Dict[str, int]:
+    histogram = {str(stars): 0 for stars in range(1, 6)}
+    for stars, count in session.exec(
+        select(ProductRating.stars, ProductRating.count).where(ProductRating.product_id == product_id)
+    ).all():
+        histogram[str(stars)] = count
+    return histogram
+
+def rebuild_ratings(session: Session) -> int:
+    """
+    Recalcula todos los resúmenes desde la tabla Review (backfill o corrección de desvíos).
+    """
+    rows = session.exec(
+        select(Review.product_id, Review.rating, func.count(Review.id))
+        .group_by(Review.product_id, Review.rating)
+    ).all()
+    
+    session.exec(delete(ProductRating))
+    session.exec(update(Products).values(rating_count=0, rating_sum=0).execution_options(synchronize_session=False))
+    
+    totals = {}
+    for product_id, stars, count in rows:
+        session.add(ProductRating(product_id=product_id, stars=stars, count=count))
+        product_count, product_sum = totals.get(product_id, (0, 0))
+        totals[product_id] = (product_count + count, product_sum + stars * count)
+    for product_id, (count, total) in totals.items():
+        session.exec(
+            update(Products)
+            .where(Products.id == product_id)
+            .values(rating_count=count, rating_sum=total)
+            .execution_options(synchronize_session=False)
+        )
+    session.commit()
+    return len(totals)
+
+if __name__ == "__main__":
+    from ..db.database import engine
+    
+    with Session(engine) as session:
+        print(f"Productos con reseñas recalculados: {rebuild_ratings(session)}")
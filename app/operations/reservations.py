@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import update, delete, case
+from ..models.db_models import Products, StockReservation, Order
+from ..db.database import engine
+from ..db.threadpool import run_in_db_thread
+
+# Las reservas retienen stock entre /payments/create y /payments/confirm.
+# Se aplican con UPDATE condicionales sobre Products.reserved, así ninguna
+# fila queda bloqueada mientras el comprador está en PayPal.
+RESERVATION_TTL_MINUTES = int(os.getenv("RESERVATION_TTL_MINUTES", "15"))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "30"))
+RESERVATION_SWEEP_BATCH = int(os.getenv("RESERVATION_SWEEP_BATCH", "500"))
+
+logger = logging.getLogger(__name__)
+
+def _hold_statement(product_id: int, quantity: int):
+    # disponible = stock - reservado; solo reserva si alcanza
+    return (
+        update(Products)
+        .where(Products.id == product_id)
+        .where(Products.stock - Products.reserved >= quantity)
+        .values(reserved=Products.reserved + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+def _release_statement(quantities: Dict[int, int]):
+    quantity = case(quantities, value=Products.id)
+    return (
+        update(Products)
+        .where(Products.id.in_(quantities))
+        .values(reserved=case((Products.reserved >= quantity, Products.reserved - quantity), else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+def _group_quantities(holds) -> Dict[int, int]:
+    quantities = {}
+    for hold in holds:
+        quantities[hold.product_id] = quantities.get(hold.product_id, 0) + hold.quantity
+    return quantities
+
+async def reserve_items(db: AsyncSession, order_id: int, quantities: Dict[int, int]) -> Dict[int, bool]:
+    """
+    Reserva stock para una orden y reporta el resultado por producto.
+    Si algún producto falla el llamador debe hacer rollback de la transacción.
+    Se recorre en orden de id para que checkouts concurrentes no se bloqueen mutuamente.
+    """
+    expires_at = datetime.utcnow() + timedelta(minutes=RESERVATION_TTL_MINUTES)
+    results = {}
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = await db.exec(_hold_statement(product_id, quantity))
+        results[product_id] = result.rowcount == 1
+        if results[product_id]:
+            db.add(StockReservation(
+                order_id=order_id,
+                product_id=product_id,
+                quantity=quantity,
+                expires_at=expires_at
+            ))
+    return results
+
+async def cancel_order_reservations(db: AsyncSession, order_id: int):
+    """
+    Libera las reservas de una orden que no llegó a PayPal y la marca como cancelada.
+    """
+    holds = (await db.exec(
+        select(StockReservation).where(StockReservation.order_id == order_id).with_for_update()
+    )).all()
+    quantities = _group_quantities(holds)
+    if quantities:
+        await db.exec(_release_statement(quantities))
+        await db.exec(delete(StockReservation).where(StockReservation.order_id == order_id))
+    await db.exec(update(Order).where(Order.id == order_id).values(status="CANCELLED"))
+    await db.commit()
+
+def consume_reservations(db: Session, order_id: int) -> Dict[int, int]:
+    """
+    Toma (y borra) las reservas vigentes de una orden al confirmar el pago.
+    Devuelve las cantidades retenidas por producto para que el descuento de
+    stock libere también Products.reserved. Las reservas ya barridas por
+    expiración simplemente no aparecen.
+    """
+    holds = db.exec(
+        select(StockReservation).where(StockReservation.order_id == order_id).with_for_update()
+    ).all()
+    if holds:
+        db.exec(delete(StockReservation).where(StockReservation.id.in_([hold.id for hold in holds])))
+    return _group_quantities(holds)
+
+def release_expired_batch(db: Session, batch_size: int = RESERVATION_SWEEP_BATCH) -> int:
+    """
+    Libera un lote de reservas vencidas. Devuelve cuántas se liberaron.
+    SKIP LOCKED permite que varios workers barran en paralelo sin pisarse.
+    """
+    holds = db.exec(
+        select(StockReservation)
+        .where(StockReservation.expires_at < datetime.utcnow())
+        .order_by(StockReservation.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not holds:
+        return 0
+    db.exec(delete(StockReservation).where(StockReservation.id.in_([hold.id for hold in holds])))
+    db.exec(_release_statement(_group_quantities(holds)))
+    db.commit()
+    return len(holds)
+
+def sweep_expired_reservations(batch_size: int = RESERVATION_SWEEP_BATCH) -> int:
+    released = 0
+    with Session(engine) as db:
+        while True:
+            count = release_expired_batch(db, batch_size)
+            released += count
+            if count < batch_size:
+                return released
+
+async def run_reservation_sweeper(interval: float = RESERVATION_SWEEP_INTERVAL):
+    """
+    Tarea de fondo (lifespan): barre reservas vencidas cada `interval` segundos.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            released = await run_in_db_thread(sweep_expired_reservations)
+            if released:
+                logger.info("Reservas vencidas liberadas: %s", released)
+        except Exception as e:
+            logger.error("Error liberando reservas vencidas: %s", e)
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import func, delete
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from ..models.db_models import Products, Order, Order_Items, Payments, SalesRollup
+from ..db.database import engine
+from ..db.threadpool import run_in_db_thread
+from .ratings import rating_average
+
+# Rollup de ventas por hora para /sales/most_sales_now.
+# Cada vez que una orden pasa a PAID se suma la cantidad vendida de cada
+# producto en su bucket horario (upsert). La lectura de "más vendidos en
+# las últimas N horas" recorre como máximo N x K filas pequeñas en lugar de
+# unir Products, Order_Items y Order en cada request.
+# Los buckets más viejos que SALES_ROLLUP_RETENTION_HOURS (la ventana máxima que
+# acepta el endpoint) se borran periódicamente: la tabla no crece sin límite.
+
+SALES_TRENDING_HOURS = int(os.getenv("SALES_TRENDING_HOURS", "12"))
+SALES_TRENDING_LIMIT = int(os.getenv("SALES_TRENDING_LIMIT", "4"))
+SALES_ROLLUP_RETENTION_HOURS = int(os.getenv("SALES_ROLLUP_RETENTION_HOURS", str(24 * 30)))
+SALES_ROLLUP_PRUNE_INTERVAL = float(os.getenv("SALES_ROLLUP_PRUNE_INTERVAL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+def bucket_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _upsert_statement(dialect: str, rows: List[dict]):
+    if dialect == "mysql":
+        statement = mysql.insert(SalesRollup).values(rows)
+        return statement.on_duplicate_key_update(
+            quantity=SalesRollup.quantity + statement.inserted.quantity
+        )
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(SalesRollup).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[SalesRollup.product_id, SalesRollup.bucket_start],
+        set_={"quantity": SalesRollup.quantity + statement.excluded.quantity},
+    )
+
+def _rollup_rows(quantities: Dict[int, int], sold_at: Optional[datetime]) -> List[dict]:
+    bucket = bucket_start(sold_at or datetime.utcnow())
+    # orden fijo por product_id: los upserts concurrentes toman los locks en el mismo orden
+    return [
+        {"product_id": product_id, "bucket_start": bucket, "quantity": quantity}
+        for product_id, quantity in sorted(quantities.items())
+        if quantity > 0
+    ]
+
+def record_sale(session: Session, quantities: Dict[int, int], sold_at: Optional[datetime] = None):
+    """
+    Suma las unidades vendidas en el bucket de la hora. Se ejecuta en la
+    misma transacción que marca la orden como PAID (el commit lo hace quien llama).
+    """
+    rows = _rollup_rows(quantities, sold_at)
+    if rows:
+        session.exec(_upsert_statement(session.get_bind().dialect.name, rows))
+
+def top_products(session: Session, hours: int = SALES_TRENDING_HOURS, limit: int = SALES_TRENDING_LIMIT,
+                 half_life_hours: Optional[float] = None) -> List[dict]:
+    """
+    Productos más vendidos en la ventana de `hours` horas (resolución horaria).
+    Con `half_life_hours` cada bucket pesa 0.5 ** (antigüedad / half_life): las
+    ventas recientes cuentan más que las del inicio de la ventana.
+    """
+    now = datetime.utcnow()
+    window_start = bucket_start(now - timedelta(hours=hours))
+    
+    if half_life_hours:
+        buckets = session.exec(
+            select(SalesRollup.product_id, SalesRollup.bucket_start, SalesRollup.quantity)
+            .where(SalesRollup.bucket_start >= window_start)
+        ).all()
+        totals, scores = {}, {}
+        for product_id, bucket, quantity in buckets:
+            # edad medida desde la mitad del bucket
+            age_hours = max((now - bucket).total_seconds() / 3600 - 0.5, 0)
+            totals[product_id] = totals.get(product_id, 0) + quantity
+            scores[product_id] = scores.get(product_id, 0.0) + quantity * 0.5 ** (age_hours / half_life_hours)
+        ranking = sorted(scores, key=lambda product_id: (-scores[product_id], product_id))[:limit]
+    else:
+        rows = session.exec(
+            select(SalesRollup.product_id, func.sum(SalesRollup.quantity).label("total_sold"))
+            .where(SalesRollup.bucket_start >= window_start)
+            .group_by(SalesRollup.product_id)
+            .order_by(func.sum(SalesRollup.quantity).desc(), SalesRollup.product_id)
+            .limit(limit)
+        ).all()
+        totals = {product_id: int(total) for product_id, total in rows}
+        scores = None
+        ranking = [product_id for product_id, _ in rows]
+    
+    if not ranking:
+        return []
+    
+    products = {
+        row.id: row
+        for row in session.exec(
+            select(
+                Products.id,
+                Products.artist_id,
+                Products.title,
+                Products.description,
+                Products.price,
+                Products.stock,
+                Products.primary_image_url,
+                Products.rating_count,
+                Products.rating_sum
+            ).where(Products.id.in_(ranking))
+        ).all()
+    }
+    
+    result = []
+    for product_id in ranking:
+        row = products.get(product_id)
+        if not row:
+            continue
+        item = {
+            "id": row.id,
+            "artist_id": row.artist_id,
+            "title": row.title,
+            "description": row.description,
+            "price": row.price,
+            "stock": row.stock,
+            "image_url": row.primary_image_url,
+            "rating_count": row.rating_count,
+            "rating_average": rating_average(row.rating_count, row.rating_sum),
+            "total_sold": totals[product_id]
+        }
+        if scores is not None:
+            item["trending_score"] = round(scores[product_id], 4)
+        result.append(item)
+    return result
+
+def rebuild(session: Session, hours: int) -> int:
+    """
+    Reconstruye los buckets de las últimas `hours` horas desde las órdenes pagadas.
+    """
+    since = bucket_start(datetime.utcnow() - timedelta(hours=hours))
+    session.exec(delete(SalesRollup).where(SalesRollup.bucket_start >= since))
+    
+    paid_at = func.min(Payments.paid_at).label("paid_at")
+    paid_orders = (
+        select(Payments.order_id, paid_at)
+        .join(Order, Order.id == Payments.order_id)
+        .where(Order.status == "PAID")
+        .group_by(Payments.order_id)
+        .subquery()
+    )
+    rows = session.exec(
+        select(Order_Items.product_id, Order_Items.quantity, paid_orders.c.paid_at)
+        .join(paid_orders, paid_orders.c.order_id == Order_Items.order_id)
+        .where(paid_orders.c.paid_at >= since)
+    ).all()
+    
+    buckets = {}
+    for product_id, quantity, sold_at in rows:
+        key = (product_id, bucket_start(sold_at))
+        buckets[key] = buckets.get(key, 0) + quantity
+    if buckets:
+        session.add_all(
+            SalesRollup(product_id=product_id, bucket_start=bucket, quantity=quantity)
+            for (product_id, bucket), quantity in buckets.items()
+        )
+    session.commit()
+    return len(buckets)
+
+def prune(session: Session, retention_hours: int = SALES_ROLLUP_RETENTION_HOURS) -> int:
+    """
+    Borra los buckets que quedaron fuera de la ventana de retención.
+    """
+    cutoff = bucket_start(datetime.utcnow() - timedelta(hours=retention_hours))
+    result = session.exec(delete(SalesRollup).where(SalesRollup.bucket_start < cutoff))
+    session.commit()
+    return result.rowcount
+
+def _prune() -> int:
+    with Session(engine) as session:
+        return prune(session)
+
+async def run_sales_rollup_pruner(interval: float = SALES_ROLLUP_PRUNE_INTERVAL):
+    """
+    Tarea de fondo (lifespan): borra los buckets vencidos cada `interval` segundos.
+    """
+    while True:
+        try:
+            pruned = await run_in_db_thread(_prune)
+            if pruned:
+                logger.info("Buckets de ventas vencidos borrados: %s", pruned)
+        except Exception as e:
+            logger.error("Error borrando buckets de ventas vencidos: %s", e)
+        await asyncio.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye el rollup horario de ventas desde las órdenes pagadas")
+    parser.add_argument("--hours", type=int, default=7 * 24)
+    args = parser.parse_args()
+    with Session(engine) as session:
+        total = rebuild(session, args.hours)
+    print(f"Buckets reconstruidos: {total}")
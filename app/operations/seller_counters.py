@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import logging
+import os
+from sqlmodel import Session, select
+from sqlalchemy import update, func, case
+from ..models.db_models import Users, Products
+from ..db.database import engine
+from ..db.threadpool import run_in_db_thread
+
+# Contador Users.product_count: todos los productos del vendedor, sin importar
+# su estado (misma semántica que el COUNT del ranking original).
+# Se ajusta en la misma transacción que crea o borra un producto; la
+# reconciliación periódica corrige cualquier desvío (escrituras fuera de la
+# API, fallos a mitad de camino, etc.).
+
+SELLER_COUNT_RECONCILE_INTERVAL = float(os.getenv("SELLER_COUNT_RECONCILE_INTERVAL", "3600"))
+SELLER_COUNT_RECONCILE_BATCH = int(os.getenv("SELLER_COUNT_RECONCILE_BATCH", "1000"))
+
+logger = logging.getLogger(__name__)
+
+def _adjust_statement(seller_id: int, delta: int):
+    return (
+        update(Users)
+        .where(Users.id == seller_id)
+        .values(product_count=case(
+            (Users.product_count + delta < 0, 0),
+            else_=Users.product_count + delta
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+def adjust_product_count(session: Session, seller_id: int, delta: int):
+    """
+    Suma `delta` al contador del vendedor sin leerlo (UPDATE atómico).
+    El commit lo hace quien llama, junto con el cambio del producto.
+    """
+    if delta:
+        session.exec(_adjust_statement(seller_id, delta))
+
+def _actual_count():
+    return (
+        select(func.count(Products.id))
+        .where(Products.artist_id == Users.id)
+        .correlate(Users)
+        .scalar_subquery()
+    )
+
+def reconcile_product_counts(session: Session, batch_size: int = SELLER_COUNT_RECONCILE_BATCH) -> int:
+    """
+    Recalcula product_count por rangos de id de usuario; devuelve cuántos estaban desviados.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        user_ids = session.exec(
+            select(Users.id).where(Users.id > last_id).order_by(Users.id).limit(batch_size)
+        ).all()
+        if not user_ids:
+            return fixed
+        actual = _actual_count()
+        result = session.exec(
+            update(Users)
+            .where(Users.id.in_(user_ids))
+            .where(Users.product_count != actual)
+            .values(product_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        fixed += result.rowcount
+        last_id = user_ids[-1]
+
+def reconcile() -> int:
+    with Session(engine) as session:
+        return reconcile_product_counts(session)
+
+async def run_seller_count_reconciler(interval: float = SELLER_COUNT_RECONCILE_INTERVAL):
+    """
+    Tarea de fondo (lifespan): reconcilia los contadores cada `interval` segundos.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            fixed = await run_in_db_thread(reconcile)
+            if fixed:
+                logger.warning("Contadores de productos corregidos: %s vendedores", fixed)
+        except Exception as e:
+            logger.error("Error reconciliando contadores de productos: %s", e)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula Users.product_count desde la tabla products")
+    parser.parse_args()
+    print(f"Vendedores corregidos: {reconcile()}")
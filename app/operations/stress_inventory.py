@@ -0,0 +1,95 @@
+import argparse
+import os
+import tempfile
+import threading
+from sqlmodel import SQLModel, Session, create_engine
+from ..models.db_models import Products, Users, Roles, Category, ProductStatus
+from .inventory import decrement_stock, decrement_stock_bulk, SOLD_STATUS_ID
+
+# Prueba de concurrencia del descuento de stock: N hilos compran 1 unidad del
+# mismo producto con stock K < N. Debe haber exactamente K compras exitosas y
+# el stock terminar en 0 (sin sobreventa), con decrement_stock y con
+# decrement_stock_bulk.
+# Uso (usa una base propia, nunca la de la aplicación):
+#   python -m app.operations.stress_inventory [--threads 50] [--stock 10] [--database-url mysql+pymysql://...]
+# Sin --database-url usa un archivo SQLite temporal. Termina con código 1 si hay sobreventa.
+
+def _seed(engine, stock: int) -> int:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        if not session.get(Roles, 2):
+            session.add(Roles(id=2, description="seller"))
+        if not session.get(Users, 1):
+            session.add(Users(id=1, name="stress", email="stress@example.com", password_hash="-", role=2, bio=None, avatar_url=None))
+        for status_id, name in ((1, "active"), (SOLD_STATUS_ID, "sold")):
+            if not session.get(ProductStatus, status_id):
+                session.add(ProductStatus(id=status_id, status=name))
+        if not session.get(Category, 1):
+            session.add(Category(id=1, name="stress"))
+        product = Products(artist_id=1, title="stress", description=None, price=1, file_url=None,
+                           stock=stock, category_id=1, status_id=1)
+        session.add(product)
+        session.commit()
+        return product.id
+
+def run(engine, mode: str, threads: int, stock: int) -> bool:
+    product_id = _seed(engine, stock)
+    barrier = threading.Barrier(threads)
+    results = []
+    errors = []
+
+    def buy():
+        barrier.wait()
+        try:
+            with Session(engine) as session:
+                if mode == "bulk":
+                    ok = decrement_stock_bulk(session, {product_id: 1})
+                else:
+                    ok = decrement_stock(session, {product_id: 1})[product_id]
+                session.commit()
+            results.append(ok)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=buy) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with Session(engine) as session:
+        product = session.get(Products, product_id)
+        sold = sum(results)
+        passed = not errors and sold == stock and product.stock == 0 and product.status_id == SOLD_STATUS_ID
+        print(
+            f"{mode}: hilos={threads} stock_inicial={stock} exitosas={sold} rechazadas={len(results) - sold} "
+            f"errores={len(errors)} stock_final={product.stock} status_id={product.status_id} "
+            f"-> {'OK' if passed else 'FALLA'}"
+        )
+        for error in errors[:3]:
+            print(f"  error: {error}")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de sobreventa con descuentos de stock concurrentes")
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--stock", type=int, default=10)
+    parser.add_argument("--mode", choices=("single", "bulk", "both"), default="both")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+    if args.stock >= args.threads:
+        parser.error("--stock debe ser menor que --threads")
+
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress_inventory.db')}"
+    # SQLite serializa las escrituras: cada hilo espera el lock en vez de fallar
+    stress_engine = create_engine(
+        url,
+        connect_args={"timeout": 60, "check_same_thread": False} if url.startswith("sqlite") else {},
+        pool_size=args.threads,
+        max_overflow=0,
+    )
+    modes = ("single", "bulk") if args.mode == "both" else (args.mode,)
+    passed = all([run(stress_engine, mode, args.threads, args.stock) for mode in modes])
+    raise SystemExit(0 if passed else 1)
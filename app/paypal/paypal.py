@@ -1,71 +1,120 @@
+import asyncio
+import time
 import httpx
 import os
+from typing import Optional
 from dotenv import load_dotenv
 from pathlib import Path
-from fastapi import HTTPException
+from fastapi import Request
 
 dotenv_path = Path(__file__).resolve().parent.parent /".env"
 load_dotenv(dotenv_path=dotenv_path)
 
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID")
 PAYPAL_SECRET = os.getenv("PAYPAL_SECRET")
-PAYPAL_BASE_URL = os.getenv("PAYPAL_BASE_URL")
+PAYPAL_BASE_URL = os.getenv("PAYPAL_BASE_URL", "https://api.sandbox.paypal.com")
 
-async def get_access_token():
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{PAYPAL_BASE_URL}/v1/oauth2/token",
-            auth=(PAYPAL_CLIENT_ID, PAYPAL_SECRET),
-            data={"grant_type": "client_credentials"},
+# Segundos antes de expires_in en los que se renueva el token
+PAYPAL_TOKEN_REFRESH_MARGIN = int(os.getenv("PAYPAL_TOKEN_REFRESH_MARGIN", "60"))
+PAYPAL_MAX_CONNECTIONS = int(os.getenv("PAYPAL_MAX_CONNECTIONS", "20"))
+PAYPAL_TIMEOUT = float(os.getenv("PAYPAL_TIMEOUT", "15"))
+
+class PayPalClient:
+    """
+    Cliente PayPal de larga vida: un solo httpx.AsyncClient con keep-alive
+    y un token OAuth cacheado que se renueva poco antes de expirar.
+    Se crea en el lifespan de la app (ver app.main) y se obtiene con get_paypal_client.
+    """
+
+    def __init__(self, base_url: str = PAYPAL_BASE_URL, client_id: Optional[str] = PAYPAL_CLIENT_ID,
+                 secret: Optional[str] = PAYPAL_SECRET, max_connections: int = PAYPAL_MAX_CONNECTIONS,
+                 timeout: float = PAYPAL_TIMEOUT, refresh_margin: int = PAYPAL_TOKEN_REFRESH_MARGIN,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._auth = (client_id, secret)
+        self._refresh_margin = refresh_margin
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            http1=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+            timeout=timeout,
+            transport=transport,
         )
-            
+        self._token = None
+        self._token_expires_at = 0.0
+        # single-flight: solo una corrutina pide un token nuevo, las demás esperan ese resultado
+        self._refresh_lock = asyncio.Lock()
+        self.token_refreshes = 0
+
+    def _token_is_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._token_expires_at
+
+    async def get_access_token(self, force_refresh: bool = False) -> str:
+        if not force_refresh and self._token_is_valid():
+            return self._token
+
+        stale_token = self._token
+        async with self._refresh_lock:
+            # otra corrutina pudo renovarlo mientras esperábamos el lock
+            if self._token_is_valid() and (not force_refresh or self._token != stale_token):
+                return self._token
+
+            resp = await self._client.post(
+                "/v1/oauth2/token",
+                auth=self._auth,
+                data={"grant_type": "client_credentials"},
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            expires_in = int(data.get("expires_in", 0))
+            self._token = data["access_token"]
+            self._token_expires_at = time.monotonic() + max(expires_in - self._refresh_margin, 0)
+            self.token_refreshes += 1
+            return self._token
+
+    async def _post(self, path: str, json: Optional[dict] = None) -> httpx.Response:
+        token = await self.get_access_token()
+        resp = await self._client.post(path, headers={"Authorization": f"Bearer {token}"}, json=json)
+        if resp.status_code == 401:
+            # token revocado antes de tiempo: renovar una vez y reintentar
+            token = await self.get_access_token(force_refresh=True)
+            resp = await self._client.post(path, headers={"Authorization": f"Bearer {token}"}, json=json)
         resp.raise_for_status()
-        return resp.json()["access_token"]
-    
-async def create_order(amount: float, currency: str = "USD"):
-    token = await get_access_token()
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "intent": "CAPTURE",
-        "purchase_units": [{
-            "amount": {
-                "currency_code": currency,
-                "value": f"{amount:.2f}"
+        return resp
+
+    async def create_order(self, amount: float, currency: str = "USD") -> dict:
+        data = {
+            "intent": "CAPTURE",
+            "purchase_units": [{
+                "amount": {
+                    "currency_code": currency,
+                    "value": f"{amount:.2f}"
+                }
+            }],
+            "application_context": {
+                "return_url": "http://localhost:5173/paypal-redirect",
+                "cancel_url": "http://localhost:5173/"
             }
-        }],
-        "application_context": {
-            "return_url": "http://localhost:5173/paypal-redirect",
-            "cancel_url": "http://localhost:5173/"
         }
-    }
-    
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{PAYPAL_BASE_URL}/v2/checkout/orders", headers=headers, json=data)
-        resp.raise_for_status()
+        resp = await self._post("/v2/checkout/orders", json=data)
         return resp.json()
-    
-async def capture_order(order_id: str):
-    token = await get_access_token()
-    headers = {
-        "Authorization": f"Bearer {token}",
-        #"Content-Type": "application/json"
-    }
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(
-                f"{PAYPAL_BASE_URL}/v2/checkout/orders/{order_id}/capture",
-                headers=headers,
-            )
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            # PayPal rechazó la captura
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Error al capturar orden en PayPal: {e.response.text}"
-            )
 
-    data = resp.json()
\ No newline at end of file
+    async def capture_order(self, order_id: str) -> dict:
+        resp = await self._post(f"/v2/checkout/orders/{order_id}/capture", json={})
+        return resp.json()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "token_refreshes": self.token_refreshes,
+            "token_valid": self._token_is_valid(),
+            "token_ttl_seconds": max(round(self._token_expires_at - time.monotonic(), 1), 0),
+        }
+
+def get_paypal_client(request: Request) -> PayPalClient:
+    return request.app.state.paypal
@@ -0,0 +1,81 @@
+"""
+Servidor PayPal local para pruebas sin red.
+
+    uvicorn app.paypal.stub_server:app --port 8081
+    PAYPAL_BASE_URL=http://127.0.0.1:8081 uvicorn app.main:app
+
+Implementa solo lo que usa PayPalClient: OAuth client_credentials,
+creación y captura de órdenes. GET /__stats devuelve contadores para
+verificar, por ejemplo, que el token se reutiliza entre checkouts.
+"""
+import os
+from datetime import datetime
+from uuid import uuid4
+from fastapi import FastAPI, HTTPException, Header
+from typing import Optional
+
+STUB_TOKEN_TTL = int(os.getenv("PAYPAL_STUB_TOKEN_TTL", "32400"))
+
+app = FastAPI(title="PayPal stub")
+
+_tokens = set()
+_orders = {}
+_stats = {"token_requests": 0, "orders_created": 0, "orders_captured": 0}
+
+def _check_token(authorization: Optional[str]):
+    token = (authorization or "").removeprefix("Bearer ").strip()
+    if token not in _tokens:
+        raise HTTPException(status_code=401, detail="invalid_token")
+
+@app.post("/v1/oauth2/token")
+def issue_token():
+    _stats["token_requests"] += 1
+    token = f"stub-{uuid4().hex}"
+    _tokens.add(token)
+    return {
+        "access_token": token,
+        "token_type": "Bearer",
+        "expires_in": STUB_TOKEN_TTL,
+    }
+
+@app.post("/v2/checkout/orders", status_code=201)
+def create_order(body: dict, authorization: Optional[str] = Header(None)):
+    _check_token(authorization)
+    _stats["orders_created"] += 1
+    order_id = uuid4().hex[:17].upper()
+    _orders[order_id] = {"status": "CREATED", "purchase_units": body.get("purchase_units", [])}
+    return {
+        "id": order_id,
+        "status": "CREATED",
+        "links": [
+            {"href": f"http://localhost/checkoutnow?token={order_id}", "rel": "approve", "method": "GET"},
+        ],
+    }
+
+@app.post("/v2/checkout/orders/{order_id}/capture", status_code=201)
+def capture_order(order_id: str, authorization: Optional[str] = Header(None)):
+    _check_token(authorization)
+    order = _orders.get(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="RESOURCE_NOT_FOUND")
+    if order["status"] == "COMPLETED":
+        raise HTTPException(status_code=422, detail="ORDER_ALREADY_CAPTURED")
+    order["status"] = "COMPLETED"
+    _stats["orders_captured"] += 1
+    return {
+        "id": order_id,
+        "status": "COMPLETED",
+        "purchase_units": [{
+            "payments": {
+                "captures": [{
+                    "id": uuid4().hex[:17].upper(),
+                    "status": "COMPLETED",
+                    "create_time": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                }]
+            }
+        }],
+    }
+
+@app.get("/__stats")
+def stats():
+    return _stats
@@ -6,11 +6,15 @@ from sqlmodel import Session, select
 from app.models.db_models import Users, PasswordResetToken
 from app.models.user_dto import UserCreate, UserRead
 from app.auth.auth import hash_password, verify_token
-from app.db.database import get_session
+from app.auth.principal_cache import principal_cache
+from app.cache.role_sampler import role_sampler
+from app.db.database import get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.auth.auth import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, create_refresh_token
 from datetime import timedelta, datetime
 from uuid import uuid4
-from app.email.send_password_reset_email import send_password_reset_email
+from app.email.send_password_reset_email import build_password_reset_email
+from app.email.outbox import email_outbox
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -19,9 +23,9 @@ class PasswordResetRequest(BaseModel):
     email: EmailStr
 
 @router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session)):
     try:
-        user = authenticate_user(form_data.username, form_data.password, session)
+        user = await authenticate_user(form_data.username, form_data.password, session)
         if not user:
             raise HTTPException(status_code=400, detail="Invalid Credentials")
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -44,6 +48,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = D
                 "created_at": user.created_at
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -63,28 +69,29 @@ def refresh_token(refresh_token: str = Body(...)):
         raise HTTPException(status_code=401, detail="Refresh token expirado")
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, session: Session = Depends(get_session)):
+async def register(user_data: UserCreate, session: AsyncSession = Depends(get_async_session)):
     #verify if the email already exists
-    existing_user = session.exec(select(Users).where(Users.email == user_data.email)).first()
+    existing_user = (await session.exec(select(Users).where(Users.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user = Users(
         name=user_data.name,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password(user_data.password),
         role="1",
         bio=user_data.bio,
         avatar_url=user_data.avatar_url)
     
     session.add(user)
     try:
-        session.commit()
-        session.refresh(user)
+        await session.commit()
+        await session.refresh(user)
     except IntegrityError:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=400, detail="User could not be created")
     
+    role_sampler.invalidate(user.role)
     return user
 
 
@@ -101,7 +108,8 @@ def request_password_reset(data: PasswordResetRequest, session: Session = Depend
 
     reset_link = f"http://localhost:5173/reset-password?token={token}"  # adaptarlo a tu frontend
     #https://my-marketplace-r21z.vercel.app"
-    send_password_reset_email(user.email, user.name, reset_link)
+    # el envío real lo hace el worker del outbox
+    email_outbox.enqueue(user.email, build_password_reset_email(user.email, user.name, reset_link))
 
     return {"message": "Correo enviado con instrucciones"}
 
@@ -110,21 +118,22 @@ class PasswordResetConfirm(BaseModel):
     new_password: str
 
 @router.post("/reset-password")
-def reset_password(data: PasswordResetConfirm, session: Session = Depends(get_session)):
-    token_entry = session.exec(
+async def reset_password(data: PasswordResetConfirm, session: AsyncSession = Depends(get_async_session)):
+    token_entry = (await session.exec(
         select(PasswordResetToken).where(PasswordResetToken.token == data.token)
-    ).first()
+    )).first()
 
     if not token_entry or token_entry.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Token inválido o expirado")
 
-    user = session.get(Users, token_entry.user_id)
+    user = await session.get(Users, token_entry.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    user.password_hash = hash_password(data.new_password)
+    user.password_hash = await hash_password(data.new_password)
     session.add(user)
-    session.delete(token_entry)
-    session.commit()
+    await session.delete(token_entry)
+    await session.commit()
+    principal_cache.invalidate(user.id)
 
     return {"message": "Contraseña actualizada exitosamente"}
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from ..models.db_models import Commission
 from ..schemas.commission import CommissionCreate, CommissionRead
 from ..db.database import get_session
+from ..operations.listing import ListParams, list_params, list_rows
 
 router = APIRouter(prefix="/commissions", tags=["Commissions"])
 
@@ -15,8 +16,8 @@ def create_commission(commission: CommissionCreate, session: Session = Depends(g
     return db_commission
 
 @router.get("/", response_model=list[CommissionRead])
-def list_commissions(session: Session = Depends(get_session)):
-    return session.exec(select(Commission)).all()
+def list_commissions(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Commission), Commission.id, CommissionRead, params, response)
 
 @router.get("/{commission_id}", response_model=CommissionRead)
 def get_commission(commission_id: int, session: Session = Depends(get_session)):
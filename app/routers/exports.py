@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from ..models.db_models import Users
+from ..db.database import get_session
+from ..auth.dependencies import get_current_user, SELLER_ROLE_ID, is_admin
+from ..operations.exports import export_statement, export_stream
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _export_response(name: str, format: str, gzip: bool, **filters) -> StreamingResponse:
+    statement = export_statement(**filters)
+    filename = f"{name}-{datetime.utcnow():%Y%m%d%H%M%S}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_stream(statement, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/sales")
+def export_sales(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    seller_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Users = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Historial de ventas (ítems pagados) de un vendedor.
+    Un vendedor solo puede exportar sus propias ventas; un admin, las de cualquiera.
+    """
+    if current_user.role == SELLER_ROLE_ID:
+        if seller_id is not None and seller_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Solo puede exportar sus propias ventas")
+        seller_id = current_user.id
+    elif not is_admin(session, current_user):
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+    
+    return _export_response(
+        "sales", format, gzip,
+        seller_id=seller_id, date_from=date_from, date_to=date_to, order_status="PAID"
+    )
+
+@router.get("/orders")
+def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    seller_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    current_user: Users = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Volcado completo de órdenes con sus ítems y pagos (solo administradores).
+    """
+    if not is_admin(session, current_user):
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+    
+    return _export_response(
+        "orders", format, gzip,
+        seller_id=seller_id, date_from=date_from, date_to=date_to, order_status=status
+    )
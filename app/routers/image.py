@@ -1,21 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from typing import List
-from ..models.db_models import Image
+from ..models.db_models import Image, Products
 from ..db.database import get_session
+from ..operations.images import refresh_primary_image
+from ..cache.product_feed import product_feed
+from ..operations.listing import ListParams, list_params, list_rows
 
 router = APIRouter(prefix="/images", tags=["Images"])
 
+def _sync_primary_image(session: Session, *product_ids: int):
+    """
+    Mantiene Products.primary_image_url en la misma transacción que el cambio de imágenes.
+    """
+    session.flush()
+    refresh_primary_image(session, *product_ids)
+
+def _invalidate_feed(session: Session, *product_ids: int):
+    category_ids = session.exec(
+        select(Products.category_id).where(Products.id.in_(set(product_ids)))
+    ).all()
+    product_feed.invalidate_category(*category_ids)
+
 @router.post("/", response_model=Image)
 def create_image(image: Image, session: Session = Depends(get_session)):
     session.add(image)
+    _sync_primary_image(session, image.product_id)
     session.commit()
     session.refresh(image)
+    _invalidate_feed(session, image.product_id)
     return image
 
 @router.get("/", response_model=list[Image])
-def read_images(session: Session = Depends(get_session)):
-    return session.exec(select(Image)).all()
+def read_images(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Image), Image.id, Image, params, response)
 
 @router.get("/by-product/{product_id}", response_model=List[Image])
 def read_images_by_product(product_id: int, session: Session = Depends(get_session)):
@@ -33,11 +51,14 @@ def update_image(image_id: int, updated: Image, session: Session = Depends(get_s
     image = session.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
+    previous_product_id = image.product_id
     image.image_url = updated.image_url
     image.product_id = updated.product_id
     session.add(image)
+    _sync_primary_image(session, previous_product_id, image.product_id)
     session.commit()
     session.refresh(image)
+    _invalidate_feed(session, previous_product_id, image.product_id)
     return image
 
 @router.delete("/{image_id}")
@@ -45,6 +66,9 @@ def delete_image(image_id: int, session: Session = Depends(get_session)):
     image = session.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
+    product_id = image.product_id
     session.delete(image)
+    _sync_primary_image(session, product_id)
     session.commit()
-    return {"ok": True, "message": "Image deleted"}
\ No newline at end of file
+    _invalidate_feed(session, product_id)
+    return {"ok": True, "message": "Image deleted"}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Request
+from ..db.database import get_pool_stats
+from ..auth.principal_cache import principal_cache
+from ..auth.password_hasher import password_hasher
+from ..email.outbox import email_outbox
+from ..cache.product_feed import product_feed
+from ..search.suggest import suggest_index
+from ..cache.role_sampler import role_sampler
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/db-pool")
+def db_pool_metrics():
+    """
+    Estado del pool de conexiones de este worker (para dimensionar workers vs max_connections de MySQL).
+    """
+    return get_pool_stats()
+
+@router.get("/principal-cache")
+def principal_cache_metrics():
+    return principal_cache.stats()
+
+@router.get("/password-hasher")
+def password_hasher_metrics():
+    return password_hasher.stats()
+
+@router.get("/paypal")
+def paypal_metrics(request: Request):
+    return request.app.state.paypal.stats()
+
+@router.get("/email-outbox")
+def email_outbox_metrics():
+    return email_outbox.stats()
+
+@router.get("/product-feed")
+def product_feed_metrics():
+    return product_feed.stats()
+
+@router.get("/suggest-index")
+def suggest_index_metrics():
+    return suggest_index.stats()
+
+
+@router.get("/role-sampler")
+def role_sampler_metrics():
+    return role_sampler.stats()
\ No newline at end of file
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from ..db.database import get_session
 from ..models.db_models import Order, Order_Items
 from ..schemas.order import OrderCreate, OrderRead, OrderItemCreate, OrderItemRead
 from typing import List
+from ..operations.listing import ListParams, list_params, list_rows
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
@@ -18,8 +19,8 @@ def create_order(order: OrderCreate, session: Session = Depends(get_session)):
     return db_order
 
 @router.get("/", response_model=List[OrderRead])
-def list_orders(session: Session = Depends(get_session)):
-    return session.exec(select(Order)).all()
+def list_orders(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Order), Order.id, OrderRead, params, response)
 
 @router.get("/{order_id}", response_model=OrderRead)
 def get_order(order_id: int, session: Session = Depends(get_session)):
@@ -48,8 +49,8 @@ def create_order_item(item: OrderItemCreate, session: Session = Depends(get_sess
     return db_item
 
 @router.get("/items/", response_model=List[OrderItemRead])
-def list_order_items(session: Session = Depends(get_session)):
-    return session.exec(select(Order_Items)).all()
+def list_order_items(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Order_Items), Order_Items.id, OrderItemRead, params, response)
 
 @router.get("/items/{item_id}", response_model=OrderItemRead)
 def get_order_item(item_id: int, session: Session = Depends(get_session)):
@@ -1,65 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from fastapi.responses import JSONResponse
 from sqlmodel import Session, select
 from ..models.db_models import Payments, Order, Users, Order_Items, Products
 from ..schemas.payment import PaymentCreate, PaymentRead
-from ..db.database import get_session
-from ..paypal.paypal import create_order, capture_order, get_access_token
-from ..email.sendSalesNotification import send_sale_notification_email
+from ..db.database import get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..paypal.paypal import PayPalClient, get_paypal_client
+from ..email.sendSalesNotification import build_sale_notification_email
+from ..email.outbox import email_outbox
+from ..cache.product_feed import product_feed
+from ..search.facets import facet_engine
 from datetime import datetime
 import httpx
-from typing import List
+from typing import List, Optional
+from sqlalchemy import update
 from ..models.order_dto import OrderCreatePayload
-from ..operations.products_crud import update_product_stock
+from ..operations.inventory import decrement_stock_bulk, insufficient_stock
+from ..operations.reservations import reserve_items, cancel_order_reservations, consume_reservations
+from ..operations.sales_rollup import record_sale
+from ..operations.idempotency import run_idempotent, request_fingerprint
+from ..db.threadpool import run_in_db_thread
 #from models.order_dto import ItemData, OrderCreatePayload, OrderItemCreate
 
 from app.auth.auth import get_current_user
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
-
-PAYPAL_BASE_URL = "https://api.sandbox.paypal.com"
-
 #UTILIDAD: buscar una orden local asociada al ID de PayPal
 
 def get_order_by_paypal_id(paypal_order_id: str, db: Session) -> Order:
     return db.query(Order).filter(Order.payment_ref == paypal_order_id).first()
 
-
 @router.post("/create")
 async def create_payment(
     payload: OrderCreatePayload,
-    db: Session = Depends(get_session),
-    current_user: Users = Depends(get_current_user)
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: Users = Depends(get_current_user),
+    paypal: PayPalClient = Depends(get_paypal_client)
     ):
+    """
+    Con el header Idempotency-Key, los reintentos del mismo checkout devuelven
+    la orden ya creada en lugar de crear otra en PayPal.
+    """
+    return await run_idempotent(
+        current_user.id,
+        idempotency_key,
+        "payments.create",
+        request_fingerprint(payload.model_dump()),
+        lambda: _create_payment(payload, db, current_user, paypal)
+    )
+
+async def _create_payment(payload: OrderCreatePayload, db: AsyncSession, current_user: Users, paypal: PayPalClient) -> dict:
     try:
         
-        # Verificar stock
+        # Verificar stock disponible (stock - reservas activas) con una sola consulta
+        quantities = {}
         for item in payload.items:
-            product = db.exec(select(Products).where(Products.id == item.product_id)).first()
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        products = {
+            product.id: product
+            for product in (await db.exec(select(Products).where(Products.id.in_(quantities)))).all()
+        }
+        titles = {product_id: product.title for product_id, product in products.items()}
+        
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
             if not product:
-                raise HTTPException(status_code=404, detail=f"Producto {item.product_id} no encontrado.")
-            if product.stock <= 0:
+                raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado.")
+            available = product.stock - product.reserved
+            if available <= 0:
                 raise HTTPException(status_code=400, detail=f"El producto '{product.title}' está agotado.")
-            if item.quantity > product.stock:
+            if quantity > available:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Cantidad solicitada de '{product.title}' excede el stock disponible ({product.stock})."
+                    detail=f"Cantidad solicitada de '{product.title}' excede el stock disponible ({available})."
                 )
-        order_data = await create_order(payload.amount)
-        paypal_order_id = order_data["id"]
         
-        #crear orden local en base de datos
+        #crear orden local y reservar el stock antes de ir a PayPal
         new_order = Order(
             buyer_id=current_user.id,
             total_amount=payload.amount,
-            payment_ref=paypal_order_id,
             status="PENDING"
         )
         db.add(new_order)
-        db.flush()
-        # db.commit()
-        # db.refresh(new_order)
+        await db.flush()
         
         #agregar detalles de la order
         for item in payload.items:
@@ -70,61 +95,53 @@ async def create_payment(
                 price=item.price
             )
             db.add(order_item)
-        db.commit()
-        db.refresh(new_order)
+        
+        reserved = await reserve_items(db, new_order.id, quantities)
+        failed = [titles[product_id] for product_id, ok in reserved.items() if not ok]
+        if failed:
+            # otro comprador reservó las últimas unidades entre la verificación y la reserva
+            await db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail=f"Stock no disponible para: {', '.join(failed)}."
+            )
+        await db.commit()
+        
+        # La reserva ya está confirmada: no se mantiene ningún lock durante la llamada a PayPal
+        try:
+            order_data = await paypal.create_order(payload.amount)
+        except Exception:
+            await cancel_order_reservations(db, new_order.id)
+            raise
+        
+        new_order.payment_ref = order_data["id"]
+        db.add(new_order)
+        await db.commit()
         
         return {
             "message": "Orden creada exitosamente",
             "paypal_order": order_data,
             "local_order_id": new_order.id
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/capture/{order_id}")
-async def capture_payment(order_id: str, db: Session = Depends(get_session)):
+async def capture_payment(
+    order_id: str,
+    db: Session = Depends(get_session),
+    paypal: PayPalClient = Depends(get_paypal_client)
+    ):
     try:
-        token = await get_access_token()
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{PAYPAL_BASE_URL}/v2/checkout/orders/{order_id}/capture",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
-                json={}
-            )
-
-        resp.raise_for_status()
-        data = resp.json()
+        data = await paypal.capture_order(order_id)
 
         capture_info = data["purchase_units"][0]["payments"]["captures"][0]
-        paypal_payment_id = capture_info["id"]
-        status = capture_info["status"]
-        paid_at = capture_info["create_time"]
-
-        order = get_order_by_paypal_id(order_id, db)
-        if not order:
-            raise HTTPException(status_code=404, detail="Orden no encontrada en la base de datos")
-
-        # Crear el pago
-        payment = Payments(
-            order_id=order.id,
-            provider="paypal",
-            payment_ref=paypal_payment_id,
-            status=status,
-            paid_at=datetime.fromisoformat(paid_at.replace("Z", "+00:00"))
-        )
-        db.add(payment)        
-        order.status = "PAID"
-        db.commit()
-        db.refresh(payment)
+        return await run_in_db_thread(_record_capture, order_id, capture_info, db)
 
-        return {
-            "message": "Pago capturado y registrado exitosamente",
-            "payment_id": payment.id,
-            "paypal_status": status
-        }
+    except HTTPException:
+        raise
 
     except httpx.HTTPStatusError as e:
         return JSONResponse(
@@ -138,8 +155,57 @@ async def capture_payment(order_id: str, db: Session = Depends(get_session)):
             content={"detail": f"Error inesperado: {str(e)}"}
         )
 
+def _record_capture(paypal_order_id: str, capture_info: dict, db: Session) -> dict:
+    order = get_order_by_paypal_id(paypal_order_id, db)
+    if not order:
+        raise HTTPException(status_code=404, detail="Orden no encontrada en la base de datos")
+
+    # La captura se guarda en su propia transacción: si después falla el descuento
+    # de stock, el cobro queda registrado para conciliarlo o reembolsarlo
+    payment = Payments(
+        order_id=order.id,
+        provider="paypal",
+        payment_ref=capture_info["id"],
+        status=capture_info["status"],
+        paid_at=datetime.fromisoformat(capture_info["create_time"].replace("Z", "+00:00"))
+    )
+    db.add(payment)
+    db.commit()
+    db.refresh(payment)
+    
+    # Misma transición a PAID que /confirm: consume las reservas y descuenta el stock
+    if order.status != "PAID":
+        _settle_paid_order(db, order)
+
+    return {
+        "message": "Pago capturado y registrado exitosamente",
+        "payment_id": payment.id,
+        "paypal_status": capture_info["status"]
+    }
+
 @router.post("/confirm/{paypal_order_id}")
-def confirm_payment(paypal_order_id: str, db: Session = Depends(get_session)):
+async def confirm_payment(
+    paypal_order_id: str,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_session)
+):
+    """
+    Con el header Idempotency-Key (ámbito: el comprador de la orden), los reintentos
+    devuelven el pago ya registrado sin volver a procesar la orden.
+    """
+    order = await run_in_db_thread(get_order_by_paypal_id, paypal_order_id, db)
+    if not order:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    
+    return await run_idempotent(
+        order.buyer_id,
+        idempotency_key,
+        "payments.confirm",
+        request_fingerprint(paypal_order_id),
+        lambda: run_in_db_thread(_confirm_payment, paypal_order_id, db)
+    )
+
+def _confirm_payment(paypal_order_id: str, db: Session) -> dict:
     order = get_order_by_paypal_id(paypal_order_id, db)
     if not order:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
@@ -147,91 +213,151 @@ def confirm_payment(paypal_order_id: str, db: Session = Depends(get_session)):
     # Verifica si ya está pagada
     if order.status == "PAID":
         return {"message": "La orden ya fue registrada como pagada"}
+    
+    payment = Payments(
+        order_id=order.id,
+        provider="paypal",
+        payment_ref=paypal_order_id,
+        status="COMPLETED",
+        paid_at=datetime.utcnow(),
+    )
+    if not _settle_paid_order(db, order, payment):
+        return {"message": "La orden ya fue registrada como pagada"}
+    return {"message": "Pago confirmado en el backend", "payment_id": payment.id}
+
+def _settle_paid_order(db: Session, order: Order, payment: Optional[Payments] = None) -> bool:
+    """
+    Pasa la orden a PAID: consume sus reservas, descuenta el stock, suma al rollup
+    de ventas y encola los emails a los vendedores; `payment` se guarda en la misma
+    transacción. Devuelve False si otra solicitud ya la había pagado.
+    """
+    # Marca la orden como PAID con un UPDATE condicional: si dos confirmaciones llegan
+    # a la vez, la segunda espera el lock de la fila y no encuentra nada que actualizar.
+    # Cualquier error posterior hace rollback y la orden vuelve a quedar pendiente.
+    claimed = db.exec(
+        update(Order)
+        .where(Order.id == order.id)
+        .where(Order.status != "PAID")
+        .values(status="PAID")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return False
 
     #obtener informacion del comprador
-    buyer = db.exec(select(Users).where(Users.id + order.buyer_id)).first()
+    buyer = db.get(Users, order.buyer_id)
     if not buyer:
         raise HTTPException(status_code=404, detail="Comprador no encontrado")
     
-    #diccionario para agrupar vendedores y sus productos 
-    sellers_data = {}
+    # Cargar items, productos y vendedores en una consulta cada uno
+    # (número constante de consultas sin importar el tamaño del carrito)
+    items = db.exec(select(Order_Items).where(Order_Items.order_id == order.id)).all()
     
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
     
-    #Descontar stock de cada producto
-    for item in order.items:
-        product = db.exec(
-            select(Products).where(Products.id == item.product_id)
-        ).first()
-
+    products = {}
+    if quantities:
+        products = {
+            product.id: product
+            for product in db.exec(select(Products).where(Products.id.in_(quantities))).all()
+        }
+    
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
         if not product:
-            raise HTTPException(status_code=404, detail=f"Producto {item.product_id} no encontrado.")
-
-        if product.stock < item.quantity:
+            raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado.")
+        if product.stock < quantity:
             raise HTTPException(
                 status_code=400,
                 detail=f"No hay stock suficiente para el producto '{product.title}'."
             )
-
-        product.stock -= item.quantity
-         # Si el stock llegó a cero, cambiar el estado del producto
-        if product.stock == 0:
-            product.status_id = 2  
-            
-        #obtener informacion del vendedor
-        seller = db.exec(select(Users).where(Users.id == product.artist_id)).first()
-        if seller:
-            if seller.id not in sellers_data:
-                sellers_data[seller.id] = {
-                    'seller_email': seller.email,
-                    'seller_name': seller.name,
-                    'products': []
-                }
-            
-            sellers_data[seller.id]['products'].append({
-                'product_title': product.title,
-                'quantity': item.quantity,
-                'price': item.price
-            })
+    
+    seller_ids = {product.artist_id for product in products.values()}
+    sellers = {}
+    if seller_ids:
+        sellers = {
+            seller.id: seller
+            for seller in db.exec(select(Users).where(Users.id.in_(seller_ids))).all()
+        }
+    
+    #Descontar stock de todos los productos en un solo UPDATE con guarda de stock,
+    #liberando a la vez las unidades que esta orden tenía reservadas
+    held = consume_reservations(db, order.id)
+    if quantities and not decrement_stock_bulk(db, quantities, held):
+        titles = {product_id: product.title for product_id, product in products.items()}
+        db.rollback()
+        report = insufficient_stock(db, quantities, held)
+        failed = [titles[product_id] for product_id, ok in report.items() if not ok]
+        raise HTTPException(
+            status_code=400,
+            detail=f"No hay stock suficiente para: {', '.join(failed) or 'uno o más productos'}."
+        )
+    
+    #diccionario para agrupar vendedores y sus productos 
+    sellers_data = {}
+    for item in items:
+        product = products[item.product_id]
+        seller = sellers.get(product.artist_id)
+        if not seller:
+            continue
+        if seller.id not in sellers_data:
+            sellers_data[seller.id] = {
+                'seller_email': seller.email,
+                'seller_name': seller.name,
+                'products': []
+            }
+        
+        sellers_data[seller.id]['products'].append({
+            'product_title': product.title,
+            'quantity': item.quantity,
+            'price': item.price
+        })
     
     # Registrar pago
-    payment = Payments(
-        order_id=order.id,
-        provider="paypal",
-        payment_ref=paypal_order_id,
-        status="COMPLETED",
-        paid_at=datetime.utcnow(),
-    )
-    db.add(payment)
+    if payment is not None:
+        db.add(payment)
     order.status = "PAID"
+    record_sale(db, quantities)
+    # datos para los emails antes del commit (evita recargar order y buyer)
+    order_id = order.id
+    buyer_name, buyer_email = buyer.name, buyer.email
+    categories = {product.category_id for product in products.values()}
     db.commit()
-    db.refresh(payment)
+    if payment is not None:
+        db.refresh(payment)
+    
+    # el stock (y el estado, si se agotó) cambió: revalidar el feed y el cubo de facetas
+    product_feed.invalidate_category(*categories)
+    facet_engine.invalidate()
     
-    # Enviar emails a cada vendedor
+    # Encolar emails a cada vendedor (los envía el worker del outbox)
     for seller_id, seller_info in sellers_data.items():
         # Calcular el total de la venta para este vendedor
         seller_total = sum(item['quantity'] * item['price'] for item in seller_info['products'])
         
         sale_details = {
-            'order_id': order.id,
+            'order_id': order_id,
             'sale_date': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-            'buyer_name': buyer.name,
-            'buyer_email': buyer.email,
+            'buyer_name': buyer_name,
+            'buyer_email': buyer_email,
             'total_amount': seller_total,
             'payment_method': 'PayPal',
             'items': seller_info['products']
         }
         
-        # Enviar email
-        email_sent = send_sale_notification_email(
+        email_outbox.enqueue(
             seller_info['seller_email'],
-            seller_info['seller_name'],
-            sale_details
+            build_sale_notification_email(
+                seller_info['seller_email'],
+                seller_info['seller_name'],
+                sale_details
+            )
         )
-        
-        if not email_sent:
-            print(f"Error enviando email a {seller_info['seller_email']}")
 
-    return {"message": "Pago confirmado en el backend", "payment_id": payment.id}
+    return True
     # try:
     #     result = await capture_order(order_id)
     #     return result
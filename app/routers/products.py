@@ -1,14 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response, Request
 from sqlmodel import Session, select
 from ..models.product_dto import ProductCreate, ProductRead, ProductUpdate, ProductsPaginatedResponse, ProductWithImage, InactiveProductResponse, ProductImageResponse, ProductStatusUpdateRequest, ProductStatusUpdateResponse
-from ..models.db_models import Products, Users, Image, Category, ProductStatus
-from ..db.database import create_engine, get_session
-from app.auth.dependencies import require_role
+from ..models.db_models import Products, Users, Image, Category, ProductStatus, Review
+from ..schemas.review import ReviewRead
+from ..db.database import create_engine, get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..db.threadpool import run_in_db_thread
+from ..cache.product_feed import product_feed
+from ..operations.pagination import encode_cursor, decode_cursor
+from ..operations.images import load_product_images, refresh_primary_image
+from ..search import fulltext as search_engine
+from ..search.suggest import suggest_index, index_product
+from ..search.facets import facet_engine, BAND_INDEX
+from ..operations.seller_counters import adjust_product_count
+from datetime import datetime
+from app.auth.dependencies import require_role, is_admin
+from ..operations.bulk_import import import_products
+from ..operations.ratings import rating_average, rating_histogram
 from sqlalchemy import func
 from typing import List, Optional
 from math import ceil
 from app.auth.auth import get_current_user
-from sqlalchemy.orm import selectinload
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -17,7 +29,7 @@ def create_product(product: ProductCreate, session: Session = Depends(get_sessio
     try:
         # Excluir image_url porque va a otra tabla
         product_data = product.model_dump(exclude={"image_url"})
-        new_product = Products(**product_data)
+        new_product = Products(**product_data, primary_image_url=product.image_url or None)
 
         # Guardar el producto
         session.add(new_product)
@@ -31,8 +43,13 @@ def create_product(product: ProductCreate, session: Session = Depends(get_sessio
             )
             session.add(product_image)
 
+        adjust_product_count(session, new_product.artist_id, 1)
+
         session.commit()
         session.refresh(new_product)
+        product_feed.invalidate_category(new_product.category_id)
+        facet_engine.invalidate()
+        index_product(new_product)
         return new_product
 
     except Exception as e:
@@ -42,12 +59,68 @@ def create_product(product: ProductCreate, session: Session = Depends(get_sessio
             detail=f"Error al crear el producto: {str(e)}"
         )
         
+@router.post("/bulk")
+async def bulk_import_products(
+    request: Request,
+    current_user: Users = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Importa muchos productos en una sola llamada: arreglo JSON, NDJSON o CSV (mismos campos que POST /products,
+    artist_id opcional). Devuelve los errores por fila y el rendimiento (filas/segundo).
+    """
+    admin = await run_in_db_thread(is_admin, session, current_user)
+    return await import_products(request, session, current_user, admin)
+
 @router.get("/", response_model=list[ProductRead])
 def list_products():
     with Session(create_engine) as session:
         products = session.exec(select(Products)).all()
         return products
     
+@router.get("/suggest")
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """
+    Sugerencias de autocompletado (productos y categorías) desde el índice en memoria.
+    Es async porque no hace I/O: se responde directo en el event loop, sin pasar por el threadpool.
+    """
+    return suggest_index.suggest(q, limit)
+
+@router.get("/facets")
+def get_product_facets(
+    category: List[int] = Query([]),
+    price_band: List[str] = Query([]),
+    is_digital: Optional[bool] = None,
+    in_stock: Optional[bool] = None,
+    seller: List[int] = Query([]),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    """
+    Catálogo filtrado con conteos por categoría, banda de precio, digital, stock y vendedor.
+    Los conteos salen del cubo cacheado de facet_engine; la BD se consulta para la página de
+    productos y, si hay filtros, para el ranking de vendedores.
+    """
+    unknown_bands = [band for band in price_band if band not in BAND_INDEX]
+    if unknown_bands:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Banda de precio inválida: {', '.join(unknown_bands)}. Use una de: {', '.join(BAND_INDEX)}"
+        )
+
+    filters = {
+        "category": set(category),
+        "price_band": {BAND_INDEX[band] for band in price_band},
+        "is_digital": {is_digital} if is_digital is not None else set(),
+        "in_stock": {in_stock} if in_stock is not None else set(),
+        "seller": set(seller),
+    }
+    return facet_engine.search(session, filters, limit, cursor)
+
 @router.get("/{product_id}", response_model=ProductRead)
 def get_product(product_id: int):
     with Session(create_engine) as session:
@@ -56,11 +129,54 @@ def get_product(product_id: int):
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         return product
     
+@router.get("/{product_id}/reviews")
+def get_product_reviews(
+    product_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    """
+    Resumen de calificaciones del producto y sus reseñas, de la más reciente a la más antigua.
+    Paginado con keyset sobre (created_at, id) usando el índice (product_id, created_at, id).
+    """
+    product = session.get(Products, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    
+    statement = (
+        select(Review)
+        .where(Review.product_id == product_id)
+        .order_by(Review.created_at.desc(), Review.id.desc())
+    )
+    if cursor:
+        position = decode_cursor(cursor, created_at=datetime, id=int)
+        statement = statement.where(
+            (Review.created_at < position["created_at"])
+            | ((Review.created_at == position["created_at"]) & (Review.id < position["id"]))
+        )
+    
+    reviews = session.exec(statement.limit(limit + 1)).all()
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor({"created_at": reviews[-1].created_at, "id": reviews[-1].id})
+    
+    return {
+        "product_id": product_id,
+        "rating_count": product.rating_count,
+        "rating_average": product.rating_average,
+        "histogram": rating_histogram(session, product_id),
+        "reviews": [ReviewRead.model_validate(review, from_attributes=True) for review in reviews],
+        "next_cursor": next_cursor
+    }
+    
 @router.patch("/{product_id}", response_model=ProductRead)
 def update_product(product_id: int, data: ProductUpdate, session: Session = Depends(get_session)):
         product = session.get(Products, product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
+        previous_category_id = product.category_id
         data_dict = data.model_dump(exclude_unset=True, exclude={"image_url"})
         for key, value in data_dict.items():
             setattr(product, key, value)
@@ -86,20 +202,29 @@ def update_product(product_id: int, data: ProductUpdate, session: Session = Depe
                         image_url=data.image_url
                     )
                     session.add(new_image)
+            session.flush()
+            refresh_primary_image(session, product_id)
         session.add(product)
         session.commit()
         session.refresh(product)
+        product_feed.invalidate_category(previous_category_id, product.category_id)
+        facet_engine.invalidate()
+        index_product(product)
         return product
     
 @router.delete("/{product_id}")
-def delete_product(product_id: int):
-    with Session(create_engine) as session:
-        product = session.get(Products, product_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        session.delete(product)
-        session.commit
-        return {"message": "Producto eliminado correctamente"}
+def delete_product(product_id: int, session: Session = Depends(get_session)):
+    product = session.get(Products, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    category_id = product.category_id
+    adjust_product_count(session, product.artist_id, -1)
+    session.delete(product)
+    session.commit()
+    product_feed.invalidate_category(category_id)
+    facet_engine.invalidate()
+    suggest_index.remove("product", product_id)
+    return {"message": "Producto eliminado correctamente"}
     
     
 @router.get("/seller/{user_id}")
@@ -111,25 +236,15 @@ def products_by_seller(user_id: int, session: Session = Depends(get_session)):
             Products.title,
             Products.description,
             Products.price,
-            Products.stock
+            Products.stock,
+            Products.primary_image_url,
+            Products.rating_count,
+            Products.rating_sum
         ).where(Products.artist_id == user_id)
         .where(Products.status_id == 1)
     )
     
     products_result = session.exec(statement).all()
-    product_ids = [row.id for row in products_result]
-    
-    if product_ids:
-        images_statement = select(Image).where(Image.product_id.in_(product_ids))
-        images_result = session.exec(images_statement).all()
-        
-        # Crear un diccionario para mapear product_id -> primera imagen
-        images_dict = {}
-        for image in images_result:
-            if image.product_id not in images_dict:
-                images_dict[image.product_id] = image.image_url
-    else:
-        images_dict = {}
     
     return [
         {
@@ -138,8 +253,10 @@ def products_by_seller(user_id: int, session: Session = Depends(get_session)):
             "title": row.title,
             "description": row.description,
             "price": row.price,
-            "image_url": images_dict.get(row.id),
-            "stock": row.stock
+            "image_url": row.primary_image_url,
+            "stock": row.stock,
+            "rating_count": row.rating_count,
+            "rating_average": rating_average(row.rating_count, row.rating_sum)
         }
         for row in products_result
     ]
@@ -153,25 +270,15 @@ def products_by_seller(user_id: int, session: Session = Depends(get_session)):
             Products.title,
             Products.description,
             Products.price,
-            Products.stock
+            Products.stock,
+            Products.primary_image_url,
+            Products.rating_count,
+            Products.rating_sum
         ).where(Products.artist_id == user_id)
         .where(Products.status_id == 1)
     )
     
     products_result = session.exec(statement).all()
-    product_ids = [row.id for row in products_result]
-    
-    if product_ids:
-        images_statement = select(Image).where(Image.product_id.in_(product_ids))
-        images_result = session.exec(images_statement).all()
-        
-        # Crear un diccionario para mapear product_id -> primera imagen
-        images_dict = {}
-        for image in images_result:
-            if image.product_id not in images_dict:
-                images_dict[image.product_id] = image.image_url
-    else:
-        images_dict = {}
     
     return [
         {
@@ -180,100 +287,18 @@ def products_by_seller(user_id: int, session: Session = Depends(get_session)):
             "title": row.title,
             "description": row.description,
             "price": row.price,
-            "image_url": images_dict.get(row.id),
-            "stock": row.stock
+            "image_url": row.primary_image_url,
+            "stock": row.stock,
+            "rating_count": row.rating_count,
+            "rating_average": rating_average(row.rating_count, row.rating_sum)
         }
         for row in products_result
     ]
     
 @router.get("/by-categories/")
-def get_products_by_categories(
-    limit_per_category: int = 10,
-    session: Session = Depends(get_session)
-):
-    #subconsulta para limitar productos por categoria
-    ranked_products = (
-        select(
-            Products.id,
-            Products.artist_id,
-            Products.title,
-            Products.description,
-            Products.price,
-            Products.is_digital,
-            Products.stock,
-            Products.created_at,
-            Products.category_id,
-            func.row_number().over(
-                partition_by=Products.category_id,
-                order_by=Products.created_at.desc()
-            ).label("rn")
-        )
-        .where(Products.status_id != 3)
-        .subquery()
-    )
-    
-    #consulta principal con JOIN
-    statement = (
-        select(
-            Category.id.label("category_id"),
-            Category.name.label("category_name"),
-            ranked_products.c.id,
-            ranked_products.c.artist_id,
-            ranked_products.c.title,
-            ranked_products.c.description,
-            ranked_products.c.price,
-            ranked_products.c.is_digital,
-            ranked_products.c.stock,
-            ranked_products.c.created_at
-        )
-        .join(ranked_products, Category.id == ranked_products.c.category_id)
-        .where(ranked_products.c.rn <= limit_per_category)
-        .order_by(Category.name, ranked_products.c.created_at.desc())
-    )
-    
-    products_result = session.exec(statement).all()
-    
-    #obtener todas las imagenes de una vez
-    product_ids = [row.id for row in products_result]
-    
-    if product_ids:
-        images_statement = select(Image).where(Image.product_id.in_(product_ids))
-        images_result = session.exec(images_statement).all()
-        
-        images_dict = {}
-        for image in images_result:
-            if image.product_id not in images_dict:
-                images_dict[image.product_id] = image.image_url
-    else:
-        images_dict = {}
-        
-    #agrupar por categoria
-    categories_dict = {}
-    
-    for row in products_result:
-        if row.category_id not in categories_dict:
-            categories_dict[row.category_id] = {
-                "category_id": row.category_id,
-                "category_name": row.category_name,
-                "products": [],
-                "total_products": 0
-            }
-        
-        categories_dict[row.category_id]["products"].append({
-            "id": row.id,
-            "artist_id": row.artist_id,
-            "title": row.title,
-            "description": row.description,
-            "price": row.price,
-            "is_digital": row.is_digital,
-            "stock": row.stock,
-            "image_url": images_dict.get(row.id),
-            "created_at": row.created_at
-        })
-        
-        categories_dict[row.category_id]["total_products"] += 1
-    
-    return list(categories_dict.values())
+def get_products_by_categories(limit_per_category: int = 10):
+    # Servido desde cache; se revalida en segundo plano cuando cambia una categoría
+    return product_feed.get_feed(limit_per_category)
 
 
 @router.get("/by-category/{category_code}", response_model=ProductsPaginatedResponse)
@@ -281,6 +306,8 @@ def get_products_by_category(
     category_code: str,
     page: int = Query(1, ge=1, description="Número de página (mínimo 1)"),
     per_page: int = Query(10, ge=1, le=100, description="Productos por página (1-100)"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor (reemplaza a page)"),
+    include_total: bool = Query(True, description="Calcular el total exacto de productos"),
     session: Session = Depends(get_session)
 ):
     """
@@ -289,6 +316,8 @@ def get_products_by_category(
     - **category_code**: Código de la categoría
     - **page**: Número de página (por defecto 1)
     - **per_page**: Cantidad de productos por página (por defecto 10, máximo 100)
+    - **cursor**: Paginación keyset; con cursor, cualquier página cuesta lo mismo que la primera
+    - **include_total**: Si es false no se ejecuta el COUNT
     """
     
     #verificar que la categoria exista
@@ -298,37 +327,57 @@ def get_products_by_category(
     if not category:
         raise HTTPException(status_code=404, detail=f"Categoría con código '{category_code}' no encontrada")
     
-    #CONTAR TOTAL DE PRODUCTOS EN LA CATEGORIA
-    count_stmt = select(func.count(Products.id)).where(Products.category_id == category.id)
-    total_products = session.exec(count_stmt).one()
-    
-    # Calcular offset para la paginación
-    offset = (page - 1) * per_page
+    #CONTAR TOTAL DE PRODUCTOS EN LA CATEGORIA (opcional)
+    total_products = None
+    if include_total:
+        count_stmt = (
+            select(func.count(Products.id))
+            .where(Products.category_id == category.id)
+            .where(Products.status_id != 3)
+        )
+        total_products = session.exec(count_stmt).one()
     
-    # Consulta principal con LEFT JOIN para incluir imágenes
+    # Usa el índice (category_id, created_at, id, status_id): recorre la categoría ya ordenada
     products_stmt = (
-        select(Products, Image.image_url)
-        .outerjoin(Image, Products.id == Image.product_id)
+        select(Products, Products.primary_image_url.label("image_url"))
         .where(Products.category_id == category.id)
         .where(Products.status_id != 3)
-        .order_by(Products.created_at.desc())
-        .offset(offset)
-        .limit(per_page)
+        .order_by(Products.created_at.desc(), Products.id.desc())
     )
     
-    results = session.exec(products_stmt).all()
+    if cursor:
+        position = decode_cursor(cursor, created_at=datetime, id=int)
+        products_stmt = products_stmt.where(
+            (Products.created_at < position["created_at"])
+            | ((Products.created_at == position["created_at"]) & (Products.id < position["id"]))
+        )
+    else:
+        # Calcular offset para la paginación
+        products_stmt = products_stmt.offset((page - 1) * per_page)
+    
+    # una fila extra para saber si hay página siguiente
+    results = session.exec(products_stmt.limit(per_page + 1)).all()
+    has_next = len(results) > per_page
+    results = results[:per_page]
     
     # Convertir resultados a ProductWithImage
     products_with_images = []
     for product, image_url in results:
         product_dict = product.model_dump()
         product_dict["image_url"] = image_url
+        product_dict["rating_average"] = product.rating_average
         products_with_images.append(ProductWithImage(**product_dict))
+    
+    next_cursor = None
+    if has_next and results:
+        last = results[-1][0]
+        next_cursor = encode_cursor({"created_at": last.created_at, "id": last.id})
         
     # Calcular metadatos de paginación
-    total_pages = ceil(total_products / per_page) if total_products > 0 else 1
-    has_next = page < total_pages
-    has_prev = page > 1
+    total_pages = None
+    if total_products is not None:
+        total_pages = ceil(total_products / per_page) if total_products > 0 else 1
+    has_prev = cursor is not None or page > 1
     
     
     return ProductsPaginatedResponse(
@@ -339,7 +388,8 @@ def get_products_by_category(
         per_page=per_page,
         total_pages=total_pages,
         has_next=has_next,
-        has_prev=has_prev
+        has_prev=has_prev,
+        next_cursor=next_cursor
     )
     
 # Endpoint para obtener productos inactivos del vendedor
@@ -347,11 +397,14 @@ def get_products_by_category(
 async def get_inactive_products(
     seller_id: int,
     status_id: int = 3,
-    session: Session = Depends(get_session)
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
-    Obtiene todos los productos inactivos (status_id = 3) del vendedor especificado.
-    Incluye las imágenes de cada producto.
+    Obtiene los productos inactivos (status_id = 3) del vendedor especificado.
+    Sin `limit` devuelve todos (comportamiento original); con `limit`, pagina con skip.
+    Incluye la imagen principal de cada producto (columna primary_image_url, sin consultar Image).
     """
     
     try:
@@ -361,41 +414,18 @@ async def get_inactive_products(
             select(Products)
             .where(Products.artist_id == seller_id)
             .where(Products.status_id == status_id)
+            .order_by(Products.created_at.desc(), Products.id.desc())
+            .offset(skip)
         )
+        if limit is not None:
+            statement = statement.limit(limit)
         
-        products = session.exec(statement).all()
+        products = (await session.exec(statement)).all()
         
         if not products:
             return []
         
-        # Preparar respuesta con imágenes
-        response_products = []
-        
-        for product in products:
-            # Obtener imágenes del producto
-            images_statement = select(Image).where(Image.product_id == product.id).limit(1)
-            first_image = session.exec(images_statement).first()
-            
-            # Obtener URL de la primera imagen, si existe
-            image_url = first_image.image_url if first_image else None
-            # Crear response del producto
-            product_response = InactiveProductResponse(
-                id=product.id,
-                title=product.title,
-                description=product.description,
-                price=product.price,
-                is_digital=product.is_digital,
-                file_url=product.file_url,
-                stock=product.stock,
-                created_at=product.created_at,
-                category_id=product.category_id,
-                status_id=product.status_id,
-                image_url=image_url
-            )
-            
-            response_products.append(product_response)
-        
-        return response_products
+        return [_inactive_product_response(product) for product in products]
         
     except HTTPException:
         raise
@@ -404,19 +434,35 @@ async def get_inactive_products(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener productos inactivos: {str(e)}"
         )
+
+def _inactive_product_response(product: Products, images: Optional[List[Image]] = None) -> InactiveProductResponse:
+    return InactiveProductResponse(
+        id=product.id,
+        title=product.title,
+        description=product.description,
+        price=product.price,
+        is_digital=product.is_digital,
+        file_url=product.file_url,
+        stock=product.stock,
+        created_at=product.created_at,
+        category_id=product.category_id,
+        status_id=product.status_id,
+        image_url=product.primary_image_url,
+        images=[ProductImageResponse(id=image.id, image_url=image.image_url) for image in images or []]
+    )
         
 # Endpoint para actualizar estado de producto (activar/desactivar)
 @router.patch("/active/{product_id}", response_model=ProductStatusUpdateResponse)
 async def activate_product(
     product_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Activa un producto (cambia status_id a 1).
     """
     try:
         # Verificar que el producto existe
-        product = session.get(Products, product_id)
+        product = await session.get(Products, product_id)
         
         if not product:
             raise HTTPException(
@@ -433,7 +479,7 @@ async def activate_product(
         
         # Verificar que el status_id 1 existe en la base de datos
         status_statement = select(ProductStatus).where(ProductStatus.id == 1)
-        product_status = session.exec(status_statement).first()
+        product_status = (await session.exec(status_statement)).first()
         
         if not product_status:
             raise HTTPException(
@@ -444,8 +490,12 @@ async def activate_product(
         # Actualizar el estado del producto a activo
         product.status_id = 1
         session.add(product)
-        session.commit()
-        session.refresh(product)
+        await session.commit()
+        await session.refresh(product)
+        # el backend compartido puede hacer I/O: fuera del event loop
+        await run_in_db_thread(product_feed.invalidate_category, product.category_id)
+        facet_engine.invalidate()
+        index_product(product)
         
         return ProductStatusUpdateResponse(
             success=True,
@@ -457,7 +507,7 @@ async def activate_product(
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al activar producto: {str(e)}"
@@ -465,14 +515,29 @@ async def activate_product(
 
 
 @router.get("/search/alike/", response_model=List[ProductWithImage])
-def search_products(query: str = Query(..., min_length=1), session: Session = Depends(get_session)):
-    statement = select(Products).where(Products.title.ilike(f"%{query}%")).options(selectinload(Products.images))
-    results = session.exec(statement).all()
+def search_products(
+    response: Response,
+    query: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100, description="Resultados por página (1-100)"),
+    cursor: Optional[str] = Query(None, description="Valor de la cabecera X-Next-Cursor de la respuesta anterior"),
+    session: Session = Depends(get_session)
+):
+    """
+    Búsqueda por relevancia en título y descripción (índice full-text).
+    Si hay más resultados, la cabecera X-Next-Cursor trae el cursor de la siguiente página.
+    """
+    offset = decode_cursor(cursor, offset=int)["offset"] if cursor else 0
+    if not 0 <= offset <= search_engine.SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    results = search_engine.search_products(session, query, limit + 1, offset)
+    if len(results) > limit:
+        if offset + limit <= search_engine.SEARCH_MAX_OFFSET:
+            response.headers["X-Next-Cursor"] = encode_cursor({"offset": offset + limit})
+        results = results[:limit]
 
     # Transformar a lista de productos con solo una imagen
     products_with_image = []
-    for product in results:
-        main_image_url = product.images[0].image_url if product.images else None
+    for product, main_image_url, _score in results:
         products_with_image.append(ProductWithImage(
             id=product.id,
             artist_id=product.artist_id,
@@ -485,7 +550,9 @@ def search_products(query: str = Query(..., min_length=1), session: Session = De
             category_id=product.category_id,
             status_id=product.status_id,
             file_url = product.file_url,
-            image_url=main_image_url
+            image_url=main_image_url,
+            rating_count=product.rating_count,
+            rating_average=product.rating_average
         ))
 
     return products_with_image
@@ -568,60 +635,18 @@ def search_products(query: str = Query(..., min_length=1), session: Session = De
 async def get_products_by_status(
     seller_id: int,
     status_id: int,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200),
     session: Session = Depends(get_session)
 ):
     """
     Obtiene productos de un vendedor filtrados por estado.
+    Sin `limit` devuelve todos (comportamiento original); con `limit`, pagina con skip.
     Útil para obtener productos activos (status_id=1) o inactivos (status_id=3).
     """
     try:
-        # Query para obtener productos del vendedor por estado
-        statement = (
-            select(Products)
-            .where(Products.artist_id == seller_id)
-            .where(Products.status_id == status_id)
-        )
-        
-        products = session.exec(statement).all()
-        
-        if not products:
-            return []
-        
-        # Preparar respuesta con imágenes
-        response_products = []
-        
-        for product in products:
-            # Obtener imágenes del producto
-            images_statement = select(Image).where(Image.product_id == product.id)
-            images = session.exec(images_statement).all()
-            
-            # Convertir imágenes a response model
-            product_images = [
-                ProductImageResponse(
-                    id=image.id,
-                    image_url=image.image_url
-                )
-                for image in images
-            ]
-            
-            # Crear response del producto
-            product_response = InactiveProductResponse(
-                id=product.id,
-                title=product.title,
-                description=product.description,
-                price=product.price,
-                is_digital=product.is_digital,
-                file_url=product.file_url,
-                stock=product.stock,
-                created_at=product.created_at,
-                category_id=product.category_id,
-                status_id=product.status_id,
-                images=product_images
-            )
-            
-            response_products.append(product_response)
-        
-        return response_products
+        # Las consultas sync se ejecutan en el pool de hilos para no bloquear el event loop
+        return await run_in_db_thread(_load_products_by_status, session, seller_id, status_id, skip, limit)
         
     except HTTPException:
         raise
@@ -629,4 +654,25 @@ async def get_products_by_status(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener productos por estado: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def _load_products_by_status(session: Session, seller_id: int, status_id: int, skip: int, limit: Optional[int]) -> List[InactiveProductResponse]:
+    # Query para obtener productos del vendedor por estado
+    statement = (
+        select(Products)
+        .where(Products.artist_id == seller_id)
+        .where(Products.status_id == status_id)
+        .order_by(Products.created_at.desc(), Products.id.desc())
+        .offset(skip)
+    )
+    if limit is not None:
+        statement = statement.limit(limit)
+    
+    products = session.exec(statement).all()
+    
+    if not products:
+        return []
+    
+    # Todas las imágenes de la página en una sola consulta
+    images = load_product_images(session, [product.id for product in products])
+    return [_inactive_product_response(product, images.get(product.id, [])) for product in products]
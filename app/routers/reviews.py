@@ -1,22 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
-from ..models.db_models import Review
+from ..models.db_models import Review, Products
 from ..schemas.review import ReviewCreate, ReviewRead
 from ..db.database import get_session
+from ..operations.listing import ListParams, list_params, list_rows
+from ..operations.ratings import apply_review
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
 @router.post("/", response_model=ReviewRead)
 def create_review(review: ReviewCreate, session: Session = Depends(get_session)):
+    if not 1 <= review.rating <= 5:
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
+    if not session.get(Products, review.product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
     db_review = Review.from_orm(review)
     session.add(db_review)
+    apply_review(session, review.product_id, review.rating, 1)
     session.commit()
     session.refresh(db_review)
     return db_review
 
 @router.get("/", response_model=list[ReviewRead])
-def list_reviews(session: Session = Depends(get_session)):
-    return session.exec(select(Review)).all()
+def list_reviews(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Review), Review.id, ReviewRead, params, response)
 
 @router.get("/{review_id}", response_model=ReviewRead)
 def get_review(review_id: int, session: Session = Depends(get_session)):
@@ -30,6 +37,7 @@ def delete_review(review_id: int, session: Session = Depends(get_session)):
     review = session.get(Review, review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
+    apply_review(session, review.product_id, review.rating, -1)
     session.delete(review)
     session.commit()
     return {"ok": True}
\ No newline at end of file
@@ -1,84 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlmodel import Session, select
 from app.db.database import get_session
 from ..models.product_dto import ProductRead
-from ..models.db_models import Products, Users, Order, Order_Items, Image
+from ..models.db_models import Users
 from ..db.database import create_engine
-from app.auth.dependencies import require_role
-from datetime import datetime, timedelta
-from sqlalchemy import func, desc
+from app.auth.dependencies import require_role, SELLER_ROLE_ID
+from ..operations import sales_rollup
+from ..operations.sales_rollup import SALES_TRENDING_HOURS, SALES_TRENDING_LIMIT, SALES_ROLLUP_RETENTION_HOURS
+from ..operations.pagination import encode_cursor, decode_cursor
+from typing import Optional
 from sqlmodel import select
 
 router = APIRouter(prefix="/sales",tags=["Sales"])
 
 @router.get("/most_sales_now")
-def list_most_sales_now(session: Session = Depends(get_session)):
-    
-    #calc the time 12 hours ago
-    twelve_hours_ago = datetime.utcnow() - timedelta(hours=12)
-    print("HACE DOCE HORAS",twelve_hours_ago)
-    
-    statement =  (
-        select(
-            Products.id,
-            Products.artist_id,
-            Products.title,
-            Products.description,
-            Products.price,
-            Products.stock,
-            func.sum(Order_Items.quantity).label("total_sold")
-        )
-        .join(Order_Items, Products.id == Order_Items.product_id)
-        .join(Order, Order_Items.order_id == Order.id)
-        .where(Order.created_at >= twelve_hours_ago)
-        .group_by(Products.id, 
-            Products.artist_id, 
-            Products.title, 
-            Products.description, 
-            Products.price,
-            Products.stock)
-        .order_by(desc("total_sold"))
-        .limit(4)
-    )
-    
-    products_result = session.exec(statement).all()
-    
-    # Obtener las imágenes de estos productos
-    product_ids = [row.id for row in products_result]
-    
-    if product_ids:
-        images_statement = select(Image).where(Image.product_id.in_(product_ids))
-        images_result = session.exec(images_statement).all()
-        # Crear un diccionario para mapear product_id -> primera imagen
-        images_dict = {}
-        for image in images_result:
-            if image.product_id not in images_dict:
-                images_dict[image.product_id] = image.image_url
-                
-    else:
-        images_dict = {}
-    
-    return [
-        {
-            "id": row.id,
-            "artist_id": row.artist_id,
-            "title": row.title,
-            "description": row.description,
-            "price": row.price,
-            "stock": row.stock,
-            "image_url": images_dict.get(row.id),
-            "total_sold": row.total_sold
-        }
-        for row in products_result
-    ]
+def list_most_sales_now(
+    hours: int = Query(SALES_TRENDING_HOURS, ge=1, le=SALES_ROLLUP_RETENTION_HOURS),
+    limit: int = Query(SALES_TRENDING_LIMIT, ge=1, le=50),
+    half_life_hours: Optional[float] = Query(None, gt=0),
+    session: Session = Depends(get_session)
+):
+    """
+    Productos más vendidos (órdenes pagadas) en las últimas `hours` horas.
+    Lee el rollup horario de ventas; con `half_life_hours` ordena por un puntaje
+    con decaimiento exponencial en vez del total de la ventana.
+    """
+    return sales_rollup.top_products(session, hours, limit, half_life_hours)
     
-
-@router.get("sellers/by-products")
+@router.get("/sellers/by-products")
 def get_sellers_by_product_count(
-    skip: int = 0,
-    limit: int = 20,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Obsoleto: use cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session)):
-    
+    """
+    Vendedores ordenados por cantidad de productos (contador Users.product_count).
+    Paginado con keyset sobre (product_count desc, id); el cursor de la página
+    siguiente viaja en el header X-Next-Cursor. `skip` se mantiene para los
+    clientes existentes (OFFSET) y solo se aplica si no se envía cursor.
+    """
     statement = (
         select(
             Users.id,
@@ -87,24 +48,26 @@ def get_sellers_by_product_count(
             Users.bio,
             Users.avatar_url,
             Users.created_at,
-            func.count(Products.id).label("product_count")
-        )
-        .outerjoin(Products, Users.id == Products.artist_id)
-        .where(Users.role == 2)
-        .group_by(
-            Users.id,
-            Users.name,
-            Users.email,
-            Users.bio,
-            Users.avatar_url,
-            Users.created_at
+            Users.product_count
         )
-        .order_by(desc("product_count"))
-        .offset(skip)
-        .limit(limit)
+        .where(Users.role == SELLER_ROLE_ID)
+        .order_by(Users.product_count.desc(), Users.id)
     )
+    if cursor:
+        position = decode_cursor(cursor, product_count=int, id=int)
+        statement = statement.where(
+            (Users.product_count < position["product_count"])
+            | ((Users.product_count == position["product_count"]) & (Users.id > position["id"]))
+        )
     
-    result = session.exec(statement).all()
+    elif skip:
+        statement = statement.offset(skip)
+    
+    result = session.exec(statement.limit(limit + 1)).all()
+    if len(result) > limit:
+        result = result[:limit]
+        last = result[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor({"product_count": last.product_count, "id": last.id})
     
     return [
         {
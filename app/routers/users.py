@@ -1,21 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from sqlmodel import Session, select
-from app.db.database import get_session
+from app.db.database import get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.db_models import Users
 from app.models.user_dto import UserCreate, UserRead, UserUpdate
-from passlib.context import CryptContext
+from app.auth.auth import hash_password
 from app.auth.dependencies import get_current_user, require_role
-from sqlalchemy import func
+from app.auth.principal_cache import principal_cache
+from app.cache.role_sampler import role_sampler
+from app.operations.listing import ListParams, list_params, list_rows
 from sqlalchemy.dialects import mysql
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-#function to hash password
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
 @router.get("/admin")
 def admin_dashboard(current_user: Users = Depends(require_role("admin"))):
     return {"msg": "Bienvenido. administrador."}
@@ -25,24 +22,24 @@ def read_my_profile(current_user: Users = Depends(get_current_user)):
     return current_user
 
 @router.post("/", response_model=UserRead)
-def create_user(user: UserCreate, session: Session = Depends(get_session)):
-    existing_user = session.exec(select(Users).where(Users.email == user.email)).first()
+async def create_user(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    existing_user = (await session.exec(select(Users).where(Users.email == user.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_data = user.dict(exclude={"password"})
-    user_data["password_hash"] = hash_password(user.password)
+    user_data["password_hash"] = await hash_password(user.password)
     db_user = Users(**user_data)
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    role_sampler.invalidate(db_user.role)
     return db_user
 
 #get all
 @router.get("/", response_model=list[UserRead])
-def get_users(session: Session = Depends(get_session)):
-    users = session.exec(select(Users)).all()
-    return users
+def get_users(response: Response, params: ListParams = Depends(list_params), session: Session = Depends(get_session)):
+    return list_rows(session, select(Users), Users.id, UserRead, params, response)
 
 #get by id
 @router.get("/{user_id}", response_model=UserRead)
@@ -54,9 +51,8 @@ def get_user(user_id: int, session: Session = Depends(get_session)):
 
 @router.get("/role/{user_role}", response_model=list[UserRead])
 def get_artist(user_role: int, session: Session = Depends(get_session)):
-    statement = select(Users).where(Users.role == user_role).order_by(func.rand()) .limit(6)
-    #statement = select(Users).join(Roles).where(Users.role == user_role).limit(10)
-    artis = session.exec(statement).all()
+    # 6 usuarios al azar del rol desde el pool de ids en memoria (sin ORDER BY RAND())
+    artis = role_sampler.sample(session, user_role, 6)
     if not artis:
         raise HTTPException(status_code=404, detail="User not found")
     return artis
@@ -68,21 +64,26 @@ def test_get_users(user_role: int, session: Session = Depends(get_session)):
 
 #update
 @router.patch("/{user_id}", response_model=UserRead)
-def update_user(user_id: int, updates: UserUpdate, session: Session = Depends(get_session)):
-    user = session.get(Users, user_id)
+async def update_user(user_id: int, updates: UserUpdate, session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = updates.dict(exclude_unset=True)
     if "password" in user_data:
-        user_data["password_hash"] = hash_password(user_data.pop("password"))
+        user_data["password_hash"] = await hash_password(user_data.pop("password"))
         
+    previous_role = user.role
     for key, value in user_data.items():
         setattr(user, key, value)
         
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
+    principal_cache.invalidate(user_id)
+    if user.role != previous_role:
+        role_sampler.invalidate(previous_role)
+        role_sampler.invalidate(user.role)
     return user
 
 #delete
@@ -92,7 +93,10 @@ def delete_user(user_id: int, session: Session = Depends(get_session)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    role = user.role
     session.delete(user)
     session.commit()
+    principal_cache.invalidate(user_id)
+    role_sampler.invalidate(role)
     return {"message": "user deleted"}
 
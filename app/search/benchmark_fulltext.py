@@ -0,0 +1,113 @@
+import argparse
+import random
+import statistics
+import time
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy import func, insert
+from ..models.db_models import Products, Users, Roles, Category, ProductStatus
+from .fulltext import create_search_index, search_products
+
+# Compara la búsqueda por relevancia (FULLTEXT / FTS5) contra el ILIKE original
+# sobre un catálogo sintético.
+# Uso (usa una base propia, nunca la de la aplicación):
+#   python -m app.search.benchmark_fulltext [--products 1000000] [--database-url sqlite:///fulltext_bench.db]
+#
+# Si la base ya tiene al menos --products productos, se reutiliza sin volver a cargarla.
+
+VOCABULARY = [
+    "ceramica", "jarron", "azul", "taza", "madera", "tallada", "collar", "plata", "lienzo", "oleo",
+    "acuarela", "tejido", "lana", "alpaca", "cuero", "bolso", "vela", "aromatica", "cuaderno", "artesanal",
+    "grabado", "lamina", "mural", "escultura", "bronce", "vidrio", "soplado", "mosaico", "tapiz", "bordado",
+    "ilustracion", "digital", "retrato", "paisaje", "abstracto", "minimalista", "vintage", "rustico", "mate", "brillante",
+]
+QUERIES = ["ceramica", "jarron azul", "plata", "acuarela paisaje", "cuero bolso", "vidrio soplado"]
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def seed(engine, total: int, batch_size: int = 10000, seed_value: int = 42):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        existing = session.exec(select(func.count(Products.id))).one()
+        if existing >= total:
+            print(f"catálogo existente: {existing} productos")
+            return
+        if not session.get(Roles, 2):
+            session.add(Roles(id=2, description="seller"))
+        if not session.get(Users, 1):
+            session.add(Users(id=1, name="bench", email="bench@example.com", password_hash="-", role=2, bio=None, avatar_url=None))
+        if not session.get(ProductStatus, 1):
+            session.add(ProductStatus(id=1, status="active"))
+        if not session.get(ProductStatus, 3):
+            session.add(ProductStatus(id=3, status="inactive"))
+        for category_id in range(1, 21):
+            if not session.get(Category, category_id):
+                session.add(Category(id=category_id, name=f"categoria {category_id}"))
+        session.commit()
+
+        rng = random.Random(seed_value)
+        loaded = existing
+        while loaded < total:
+            rows = [
+                {
+                    "artist_id": 1,
+                    "title": _text(rng, 3),
+                    "description": _text(rng, 20),
+                    "price": round(rng.uniform(5, 500), 2),
+                    "is_digital": False,
+                    "file_url": None,
+                    "stock": rng.randint(0, 20),
+                    "reserved": 0,
+                    "rating_count": 0,
+                    "rating_sum": 0,
+                    "category_id": rng.randint(1, 20),
+                    "status_id": 3 if rng.random() < 0.1 else 1,
+                }
+                for _ in range(min(batch_size, total - loaded))
+            ]
+            session.exec(insert(Products), params=rows)
+            session.commit()
+            loaded += len(rows)
+            print(f"productos cargados: {loaded}")
+
+def _time(run, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def benchmark(engine, limit: int = 20, repeat: int = 5):
+    with Session(engine) as session:
+        print(f"{'consulta':<20}{'ilike (original) ms':>22}{'ilike página ms':>18}{'fulltext ms':>14}{'filas ilike':>14}")
+        for query in QUERIES:
+            original = select(Products).where(Products.title.ilike(f"%{query}%"))
+            page = (
+                select(Products)
+                .where(Products.title.ilike(f"%{query}%") | Products.description.ilike(f"%{query}%"))
+                .where(Products.status_id != 3)
+                .order_by(Products.created_at.desc(), Products.id.desc())
+                .limit(limit)
+            )
+            matched = []
+            ilike_ms = _time(lambda: matched.append(len(session.exec(original).all())), repeat)
+            page_ms = _time(lambda: session.exec(page).all(), repeat)
+            fulltext_ms = _time(lambda: search_products(session, query, limit), repeat)
+            session.expunge_all()
+            print(f"{query:<20}{ilike_ms:>22.1f}{page_ms:>18.1f}{fulltext_ms:>14.1f}{matched[-1]:>14}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda FULLTEXT/FTS5 contra ILIKE")
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--database-url", default="sqlite:///fulltext_bench.db")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_engine = create_engine(args.database_url)
+    seed(bench_engine, args.products)
+    started = time.perf_counter()
+    create_search_index(bench_engine)
+    print(f"índice de búsqueda listo en {time.perf_counter() - started:.1f} s")
+    benchmark(bench_engine, args.limit, args.repeat)
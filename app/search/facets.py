@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from sqlmodel import Session, select
+from sqlalchemy import func, case, and_
+from ..models.db_models import Products, Category, Users
+from ..models.product_dto import ProductWithImage
+from ..operations.pagination import encode_cursor, decode_cursor
+
+# Búsqueda facetada del catálogo.
+# Los conteos salen de un "cubo": una consulta GROUP BY sobre
+# (categoría, banda de precio, digital, en stock) que se cachea
+# FACET_CUBE_TTL segundos (o hasta que una escritura de productos lo invalida),
+# junto con el ranking global de vendedores. Con el cubo en memoria, los conteos
+# de cualquier combinación de filtros se calculan en Python; sin filtros, por
+# petición solo se consulta la página.
+FACET_CUBE_TTL = float(os.getenv("FACET_CUBE_TTL", "60"))
+FACET_MAX_SELLERS = int(os.getenv("FACET_MAX_SELLERS", "20"))
+
+INACTIVE_STATUS_ID = 3
+
+# (mínimo incluido, máximo excluido); None = sin límite
+PRICE_BANDS = [(0, 25), (25, 50), (50, 100), (100, 250), (250, 500), (500, None)]
+
+def band_key(index: int) -> str:
+    low, high = PRICE_BANDS[index]
+    return f"{low}-{high}" if high is not None else f"{low}+"
+
+BAND_INDEX = {band_key(i): i for i in range(len(PRICE_BANDS))}
+
+def price_band_expression():
+    whens = []
+    for index, (low, high) in enumerate(PRICE_BANDS[:-1]):
+        whens.append((and_(Products.price >= low, Products.price < high), index))
+    return case(*whens, else_=len(PRICE_BANDS) - 1)
+
+def in_stock_expression():
+    return case((Products.stock - Products.reserved > 0, True), else_=False)
+
+def _apply_filters(statement, filters: Dict[str, Set]):
+    if filters.get("category"):
+        statement = statement.where(Products.category_id.in_(filters["category"]))
+    if filters.get("price_band"):
+        statement = statement.where(price_band_expression().in_(filters["price_band"]))
+    if filters.get("is_digital"):
+        statement = statement.where(Products.is_digital.in_(filters["is_digital"]))
+    if filters.get("in_stock"):
+        statement = statement.where(in_stock_expression().in_(filters["in_stock"]))
+    return statement
+
+# posición de cada faceta dentro de una celda del cubo
+FACETS = ("category", "price_band", "is_digital", "in_stock")
+
+class FacetEngine:
+    """
+    El cubo agrupa por (categoría, banda, digital, stock): su tamaño depende de
+    la cantidad de categorías, no de productos ni vendedores. La faceta vendedor
+    se resuelve aparte con los filtros de las demás facetas: sin filtros sale del
+    ranking global precalculado; con filtros, de una consulta agrupada.
+    """
+
+    def __init__(self, ttl: float = FACET_CUBE_TTL):
+        self.ttl = ttl
+        self._cube = None
+        self._built_at = 0.0
+        self._building = False
+        # sube en cada invalidate: un cubo armado durante una escritura nace vencido
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _query_cells(session: Session, sellers: Optional[Set[int]] = None) -> List[tuple]:
+        band = price_band_expression()
+        in_stock = in_stock_expression()
+        statement = (
+            select(Products.category_id, band, Products.is_digital, in_stock, func.count(Products.id))
+            .where(Products.status_id != INACTIVE_STATUS_ID)
+            .group_by(Products.category_id, band, Products.is_digital, in_stock)
+        )
+        if sellers:
+            statement = statement.where(Products.artist_id.in_(sellers))
+        return [(row[0], int(row[1]), bool(row[2]), bool(row[3]), row[4]) for row in session.exec(statement).all()]
+
+    @staticmethod
+    def _query_seller_counts(session: Session, sellers: Optional[Set[int]] = None, filters: Optional[Dict[str, Set]] = None) -> List[tuple]:
+        statement = (
+            select(Products.artist_id, func.count(Products.id))
+            .where(Products.status_id != INACTIVE_STATUS_ID)
+            .group_by(Products.artist_id)
+            .order_by(func.count(Products.id).desc(), Products.artist_id)
+        )
+        statement = _apply_filters(statement, filters or {})
+        if sellers:
+            statement = statement.where(Products.artist_id.in_(sellers))
+        else:
+            statement = statement.limit(FACET_MAX_SELLERS)
+        return session.exec(statement).all()
+
+    def cube(self, session: Session) -> dict:
+        with self._lock:
+            fresh = self._cube is not None and time.monotonic() - self._built_at <= self.ttl
+            if fresh or (self._cube is not None and self._building):
+                # vigente, u otro request ya lo está reconstruyendo: usar el actual
+                return self._cube
+            self._building = True
+            generation = self._generation
+        try:
+            # la consulta se hace fuera del lock
+            cube = {"cells": self._query_cells(session), "top_sellers": self._query_seller_counts(session)}
+        finally:
+            with self._lock:
+                self._building = False
+        with self._lock:
+            self._cube = cube
+            self._built_at = time.monotonic() if generation == self._generation else float("-inf")
+        return cube
+
+    def invalidate(self):
+        # se conserva el cubo viejo para servirlo mientras un request lo reconstruye
+        with self._lock:
+            self._generation += 1
+            self._built_at = float("-inf")
+
+    @staticmethod
+    def _matches(cell: tuple, filters: Dict[str, Set], skip: Optional[str] = None) -> bool:
+        for position, facet in enumerate(FACETS):
+            if facet == skip:
+                continue
+            selected = filters.get(facet)
+            if selected and cell[position] not in selected:
+                return False
+        return True
+
+    def facet_counts(self, cells: List[tuple], filters: Dict[str, Set]) -> Dict[str, Dict]:
+        """
+        Conteos disjuntivos: cada faceta se cuenta con los filtros de las demás,
+        así el usuario ve cuántos resultados tendría al cambiar su selección.
+        """
+        counts = {facet: {} for facet in FACETS}
+        for cell in cells:
+            for position, facet in enumerate(FACETS):
+                if self._matches(cell, filters, skip=facet):
+                    value = cell[position]
+                    counts[facet][value] = counts[facet].get(value, 0) + cell[-1]
+        return counts
+
+    def search(self, session: Session, filters: Dict[str, Set], limit: int, cursor: Optional[str] = None) -> dict:
+        cube = self.cube(session)
+        sellers = filters.get("seller")
+        if sellers:
+            # celdas solo de los vendedores elegidos (consulta acotada por sus productos)
+            cells = self._query_cells(session, sellers)
+            selected_sellers = self._query_seller_counts(session, sellers, filters)
+        else:
+            cells = cube["cells"]
+            selected_sellers = []
+        # ranking de vendedores con los filtros de las demás facetas (como el resto)
+        if any(filters.get(facet) for facet in FACETS):
+            top_sellers = self._query_seller_counts(session, None, filters)
+        else:
+            top_sellers = cube["top_sellers"]
+        counts = self.facet_counts(cells, filters)
+        total = sum(cell[-1] for cell in cells if self._matches(cell, filters))
+
+        statement = (
+            select(Products, Products.primary_image_url.label("image_url"))
+            .where(Products.status_id != INACTIVE_STATUS_ID)
+            .order_by(Products.created_at.desc(), Products.id.desc())
+        )
+        statement = _apply_filters(statement, filters)
+        if sellers:
+            statement = statement.where(Products.artist_id.in_(sellers))
+        if cursor:
+            position = decode_cursor(cursor, created_at=datetime, id=int)
+            statement = statement.where(
+                (Products.created_at < position["created_at"])
+                | ((Products.created_at == position["created_at"]) & (Products.id < position["id"]))
+            )
+
+        results = session.exec(statement.limit(limit + 1)).all()
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1][0]
+            next_cursor = encode_cursor({"created_at": last.created_at, "id": last.id})
+
+        products = []
+        for product, image_url in results:
+            product_dict = product.model_dump()
+            product_dict["image_url"] = image_url
+            product_dict["rating_average"] = product.rating_average
+            products.append(ProductWithImage(**product_dict))
+
+        return {
+            "products": products,
+            "total": total,
+            "next_cursor": next_cursor,
+            "facets": self._format_facets(session, counts, filters, selected_sellers, top_sellers),
+        }
+
+    def _format_facets(self, session: Session, counts: Dict[str, Dict], filters: Dict[str, Set],
+                       selected_sellers: List[tuple], top_sellers: List[tuple]) -> dict:
+        # vendedores seleccionados, luego el resto del ranking (ambos con los mismos filtros)
+        seen = {seller_id for seller_id, _ in selected_sellers}
+        top_sellers = list(selected_sellers) + [item for item in top_sellers if item[0] not in seen]
+        top_sellers = top_sellers[:max(FACET_MAX_SELLERS, len(selected_sellers))]
+        category_names = {}
+        if counts["category"]:
+            category_names = dict(session.exec(
+                select(Category.id, Category.name).where(Category.id.in_(counts["category"]))
+            ).all())
+        seller_names = {}
+        if top_sellers:
+            seller_names = dict(session.exec(
+                select(Users.id, Users.name).where(Users.id.in_([seller_id for seller_id, _ in top_sellers]))
+            ).all())
+
+        def option(facet, value, count, label, selected=None):
+            if selected is None:
+                selected = value in filters.get(facet, set())
+            return {"value": value, "label": label, "count": count, "selected": selected}
+
+        return {
+            "category": sorted(
+                (option("category", value, count, category_names.get(value)) for value, count in counts["category"].items()),
+                key=lambda item: -item["count"]
+            ),
+            "price_band": [
+                option("price_band", band_key(index), counts["price_band"].get(index, 0), band_key(index),
+                       selected=index in filters.get("price_band", set()))
+                for index in range(len(PRICE_BANDS))
+            ],
+            "is_digital": [
+                option("is_digital", value, counts["is_digital"].get(value, 0), "Digital" if value else "Físico")
+                for value in (True, False)
+            ],
+            "in_stock": [
+                option("in_stock", value, counts["in_stock"].get(value, 0), "Disponible" if value else "Agotado")
+                for value in (True, False)
+            ],
+            "seller": [option("seller", value, count, seller_names.get(value)) for value, count in top_sellers],
+        }
+
+facet_engine = FacetEngine()
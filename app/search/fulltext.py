@@ -0,0 +1,126 @@
+import os
+import re
+from typing import List, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import text, column, Integer, Float, literal, or_
+from sqlalchemy.dialects.mysql import match
+from ..models.db_models import Products
+
+# Búsqueda de productos por relevancia sobre title + description.
+# - MySQL: índice FULLTEXT sobre (title, description) con MATCH ... AGAINST
+# - SQLite (tests/local): tabla virtual FTS5 products_fts sincronizada con triggers
+# - Otros dialectos: LIKE como respaldo
+# Los productos inactivos (status_id == 3) nunca aparecen.
+#
+# El índice no se crea al iniciar la aplicación. En una base existente hay que
+# crearlo una vez (en MySQL tarda en tablas grandes; conviene fuera de horario):
+#   python -m app.search.fulltext
+# que equivale a:
+#   MySQL:  CREATE FULLTEXT INDEX ft_products_title_description ON products (title, description);
+#   SQLite: SQLITE_FTS_DDL (tabla products_fts, sus triggers y el 'rebuild' que la rellena)
+
+INACTIVE_STATUS_ID = 3
+# InnoDB no indexa palabras de menos de 3 letras (innodb_ft_min_token_size)
+MIN_FULLTEXT_LENGTH = 3
+# La paginación por relevancia usa OFFSET (no hay índice sobre el puntaje):
+# cada página vuelve a calcular y descartar las anteriores, así que se limita la profundidad
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "1000"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        title, description, content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF title, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO products_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+MYSQL_FULLTEXT_INDEX = "ft_products_title_description"
+
+def create_search_index(engine):
+    """
+    Crea el índice de búsqueda si no existe: FULLTEXT en MySQL, FTS5 en SQLite.
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "mysql":
+            exists = conn.execute(
+                text(
+                    "SELECT COUNT(*) FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = 'products' AND index_name = :name"
+                ),
+                {"name": MYSQL_FULLTEXT_INDEX},
+            ).scalar()
+            if not exists:
+                conn.exec_driver_sql(
+                    f"CREATE FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ON products (title, description)"
+                )
+        elif dialect == "sqlite":
+            for statement in SQLITE_FTS_DDL:
+                conn.exec_driver_sql(statement)
+
+def _tokens(query: str) -> List[str]:
+    return _TOKEN_RE.findall(query.lower())
+
+def search_products(session: Session, query: str, limit: int, offset: int = 0) -> List[Tuple]:
+    """
+    Devuelve filas (Products, image_url, score) ordenadas por relevancia.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    
+    dialect = session.get_bind().dialect.name
+    base = select(Products, Products.primary_image_url.label("image_url"))
+    
+    if dialect == "mysql" and len(max(tokens, key=len)) >= MIN_FULLTEXT_LENGTH:
+        score = match(Products.title, Products.description, against=" ".join(tokens))
+        statement = (
+            base.add_columns(score.label("score"))
+            .where(score > 0)
+            .order_by(score.desc(), Products.id.desc())
+        )
+    elif dialect == "sqlite":
+        # cada término como prefijo: "ceram"* encuentra "cerámica"
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        fts = (
+            text("SELECT rowid AS id, bm25(products_fts) AS rank FROM products_fts WHERE products_fts MATCH :q")
+            .bindparams(q=fts_query)
+            .columns(column("id", Integer), column("rank", Float))
+            .subquery("fts")
+        )
+        statement = (
+            base.add_columns((-fts.c.rank).label("score"))
+            .join(fts, fts.c.id == Products.id)
+            .order_by(fts.c.rank, Products.id.desc())
+        )
+    else:
+        # consultas muy cortas o dialecto sin full-text: prefijo sobre el título
+        pattern = f"{query.strip()}%" if len(query.strip()) < MIN_FULLTEXT_LENGTH else f"%{query.strip()}%"
+        statement = (
+            base.add_columns(literal(1.0).label("score"))
+            .where(or_(Products.title.ilike(pattern), Products.description.ilike(pattern)))
+            .order_by(Products.created_at.desc(), Products.id.desc())
+        )
+    
+    statement = (
+        statement.where(Products.status_id != INACTIVE_STATUS_ID)
+        .offset(offset)
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+if __name__ == "__main__":
+    from ..db.database import engine
+    create_search_index(engine)
+    print(f"Índice de búsqueda listo ({engine.dialect.name})")
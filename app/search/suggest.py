@@ -0,0 +1,259 @@
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import func
+from ..models.db_models import Products, Category, Order_Items
+from ..db.database import engine
+from ..db.threadpool import run_in_db_thread
+
+# Autocompletado en memoria (sin tocar la BD por petición) sobre títulos de
+# productos y nombres de categorías. Se actualiza en cada alta/edición/baja de
+# producto y se reconstruye completo cada SUGGEST_REBUILD_INTERVAL segundos
+# para refrescar la popularidad (unidades vendidas).
+SUGGEST_REBUILD_INTERVAL = float(os.getenv("SUGGEST_REBUILD_INTERVAL", "600"))
+# prefijos de hasta SUGGEST_PREFIX_CACHE_LEN caracteres (los que más coincidencias
+# tienen) guardan precalculados sus SUGGEST_TOP_K elementos más populares
+SUGGEST_PREFIX_CACHE_LEN = int(os.getenv("SUGGEST_PREFIX_CACHE_LEN", "3"))
+SUGGEST_TOP_K = int(os.getenv("SUGGEST_TOP_K", "20"))
+
+INACTIVE_STATUS_ID = 3
+
+logger = logging.getLogger(__name__)
+
+def normalize(value: str) -> str:
+    # minúsculas, sin tildes y con espacios simples: "Cerámica  Azul" -> "ceramica azul"
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.lower().split())
+
+class PrefixIndex:
+    """
+    Arreglo ordenado de claves (búsqueda por prefijo con bisect).
+    Cada elemento se indexa desde el inicio de cada palabra, así "azul" también
+    encuentra "Jarrón azul".
+    Los prefijos cortos tienen además su top-k por popularidad (por tipo y
+    global), mantenido en cada alta/edición/baja; los prefijos largos recorren
+    su rango completo, que ya es chico.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._items = {}
+        self._top = {}
+        # listas top-k que perdieron un elemento estando llenas: se recalculan al consultarlas
+        self._stale = set()
+        self._lock = threading.RLock()
+        self._journal = None
+        self.ready = False
+
+    @staticmethod
+    def _index_keys(text: str, ref) -> list:
+        words = normalize(text).split()
+        return [(" ".join(words[i:]), ref) for i in range(len(words))]
+
+    @staticmethod
+    def _top_keys(text: str, kind: str) -> set:
+        keys = set()
+        for word_start in PrefixIndex._index_keys(text, None):
+            for length in range(1, min(len(word_start[0]), SUGGEST_PREFIX_CACHE_LEN) + 1):
+                prefix = word_start[0][:length]
+                keys.add((prefix, None))
+                keys.add((prefix, kind))
+        return keys
+
+    def _place_top(self, ref, popularity: float, previous: Optional[float] = None):
+        item = self._items[ref]
+        for key in self._top_keys(item["text"], item["kind"]):
+            if key in self._stale:
+                continue
+            top = self._top.setdefault(key, [])
+            if ref in top:
+                if previous is not None and popularity < previous and len(top) >= SUGGEST_TOP_K:
+                    # pudo quedar por debajo de alguien que no está en la lista
+                    self._stale.add(key)
+                    continue
+                top.remove(ref)
+            elif len(top) >= SUGGEST_TOP_K and popularity <= self._items[top[-1]]["popularity"]:
+                continue
+            position = 0
+            while position < len(top) and self._items[top[position]]["popularity"] >= popularity:
+                position += 1
+            top.insert(position, ref)
+            del top[SUGGEST_TOP_K:]
+
+    def _drop_top(self, ref, current: dict):
+        for key in self._top_keys(current["text"], current["kind"]):
+            top = self._top.get(key)
+            if not top or ref not in top or key in self._stale:
+                continue
+            if len(top) >= SUGGEST_TOP_K:
+                # la lista estaba llena: el siguiente en popularidad no se conoce
+                self._stale.add(key)
+            else:
+                top.remove(ref)
+
+    def upsert(self, kind: str, item_id: int, text: str, popularity: float = 0):
+        ref = (kind, item_id)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("upsert", kind, item_id, text, popularity))
+            current = self._items.get(ref)
+            if current is not None and current["text"] == text:
+                previous, current["popularity"] = current["popularity"], popularity
+                self._place_top(ref, popularity, previous)
+                return
+            self._remove_keys(ref)
+            self._items[ref] = {"kind": kind, "id": item_id, "text": text, "popularity": popularity}
+            for key in self._index_keys(text, ref):
+                insort(self._keys, key)
+            self._place_top(ref, popularity)
+
+    def remove(self, kind: str, item_id: int):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("remove", kind, item_id))
+            self._remove_keys((kind, item_id))
+            self._items.pop((kind, item_id), None)
+
+    def _remove_keys(self, ref):
+        current = self._items.get(ref)
+        if current is None:
+            return
+        self._drop_top(ref, current)
+        for key in self._index_keys(current["text"], ref):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def popularity(self, kind: str, item_id: int) -> float:
+        with self._lock:
+            current = self._items.get((kind, item_id))
+            return current["popularity"] if current else 0
+
+    def begin_rebuild(self):
+        # los cambios incrementales que lleguen durante la carga se reaplican al final
+        with self._lock:
+            self._journal = []
+
+    def abort_rebuild(self):
+        with self._lock:
+            self._journal = None
+
+    def replace_all(self, items: list):
+        # construcción completa: se arma fuera del lock y se intercambia de una vez
+        keys = []
+        by_ref = {}
+        tops = {}
+        for item in items:
+            ref = (item["kind"], item["id"])
+            by_ref[ref] = item
+            keys.extend(self._index_keys(item["text"], ref))
+            for key in self._top_keys(item["text"], item["kind"]):
+                tops.setdefault(key, []).append(ref)
+        keys.sort()
+        for key, refs in tops.items():
+            tops[key] = heapq.nlargest(SUGGEST_TOP_K, refs, key=lambda ref: by_ref[ref]["popularity"])
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            self._keys = keys
+            self._items = by_ref
+            self._top = tops
+            self._stale = set()
+            self.ready = True
+            for operation, *args in journal:
+                getattr(self, operation)(*args)
+
+    def suggest(self, prefix: str, limit: int = 8, kind: Optional[str] = None) -> List[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            if len(prefix) <= SUGGEST_PREFIX_CACHE_LEN and limit <= SUGGEST_TOP_K:
+                key = (prefix, kind)
+                if key in self._stale:
+                    self._top[key] = [item_ref for item_ref, _ in self._scan(prefix, kind, SUGGEST_TOP_K)]
+                    self._stale.discard(key)
+                top = [self._items[ref] for ref in self._top.get(key, [])[:limit]]
+            else:
+                top = [item for _, item in self._scan(prefix, kind, limit)]
+        return [{"kind": item["kind"], "id": item["id"], "text": item["text"]} for item in top]
+
+    def _scan(self, prefix: str, kind: Optional[str], limit: int) -> list:
+        # recorre todas las claves del prefijo y elige las `limit` más populares
+        matches = {}
+        position = bisect_left(self._keys, (prefix,))
+        while position < len(self._keys):
+            key, ref = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            if kind is None or ref[0] == kind:
+                matches[ref] = self._items[ref]
+            position += 1
+        return heapq.nlargest(limit, matches.items(), key=lambda entry: entry[1]["popularity"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ready": self.ready, "items": len(self._items), "keys": len(self._keys),
+                    "cached_prefixes": len(self._top), "stale_prefixes": len(self._stale)}
+
+
+def load_suggest_items(session: Session) -> list:
+    sold = (
+        select(Order_Items.product_id, func.sum(Order_Items.quantity).label("sold"))
+        .group_by(Order_Items.product_id)
+        .subquery()
+    )
+    products = session.exec(
+        select(Products.id, Products.title, func.coalesce(sold.c.sold, 0))
+        .outerjoin(sold, sold.c.product_id == Products.id)
+        .where(Products.status_id != INACTIVE_STATUS_ID)
+    ).all()
+    categories = session.exec(
+        select(Category.id, Category.name, func.count(Products.id))
+        .outerjoin(Products, Products.category_id == Category.id)
+        .group_by(Category.id, Category.name)
+    ).all()
+    items = [{"kind": "product", "id": pid, "text": title, "popularity": float(popularity)}
+             for pid, title, popularity in products]
+    items += [{"kind": "category", "id": cid, "text": name, "popularity": float(count)}
+              for cid, name, count in categories]
+    return items
+
+suggest_index = PrefixIndex()
+
+def rebuild_suggest_index():
+    suggest_index.begin_rebuild()
+    try:
+        with Session(engine) as session:
+            items = load_suggest_items(session)
+    except Exception:
+        suggest_index.abort_rebuild()
+        raise
+    suggest_index.replace_all(items)
+
+def index_product(product: Products):
+    """
+    Actualiza el índice después de crear o editar un producto.
+    """
+    if product.status_id == INACTIVE_STATUS_ID:
+        suggest_index.remove("product", product.id)
+        return
+    popularity = suggest_index.popularity("product", product.id)
+    suggest_index.upsert("product", product.id, product.title, popularity)
+
+async def run_suggest_rebuilder(interval: float = SUGGEST_REBUILD_INTERVAL):
+    """
+    Tarea de fondo (lifespan): construye el índice al iniciar y lo refresca periódicamente.
+    """
+    while True:
+        try:
+            await run_in_db_thread(rebuild_suggest_index)
+        except Exception as e:
+            logger.error("Error reconstruyendo el índice de sugerencias: %s", e)
+        await asyncio.sleep(interval)